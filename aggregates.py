@@ -0,0 +1,110 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_store import (
+    CACHE_DIR,
+    STRESS_DATASET,
+    STRESS_LEVEL_DATASET,
+    dataset_name,
+    dataset_version,
+    load_stress_dataset,
+    load_stress_level_dataset,
+    memoized,
+)
+from timings import span
+
+AGGREGATE_DIR = os.path.join(CACHE_DIR, "aggregates")
+
+STRESS_DIMENSIONS = ["Age", "Gender", "stress_type"]
+STRESS_LEVEL_DIMENSIONS = ["stress_level", "cluster"]
+
+
+# -------- CUBE --------
+def build_cube(df, dims, measures=None):
+    """Count, sum and sum of squares of every measure for each combination of dims."""
+    if measures is None:
+        measures = [c for c in df.select_dtypes(include=[np.number]).columns if c not in dims]
+    values = df[measures].astype(np.float64)
+    keys = [df[d] for d in dims]
+
+    counts = df.groupby(keys, observed=True).size().rename("count")
+    sums = values.groupby(keys, observed=True).sum().add_suffix("__sum")
+    sumsq = (values ** 2).groupby(keys, observed=True).sum().add_suffix("__sumsq")
+    return pd.concat([counts, sums, sumsq], axis=1).reset_index()
+
+
+def measures_of(cube):
+    return [c[: -len("__sum")] for c in cube.columns if c.endswith("__sum")]
+
+
+def rollup(cube, by, measure=None):
+    # sums over the dimensions not in `by`; count is always returned, plus the
+    # mean and sample std of `measure` when given
+    columns = ["count"]
+    if measure is not None:
+        columns += [f"{measure}__sum", f"{measure}__sumsq"]
+    grouped = cube.groupby(by, observed=True, sort=True)[columns].sum()
+    if measure is None:
+        return grouped
+
+    n = grouped["count"]
+    total, total_sq = grouped[f"{measure}__sum"], grouped[f"{measure}__sumsq"]
+    var = (total_sq - total ** 2 / n) / (n - 1)
+    return pd.DataFrame(
+        {
+            "count": n,
+            "mean": total / n,
+            "std": np.sqrt(var.clip(lower=0)).where(n > 1),
+        }
+    )
+
+
+# -------- CACHED CUBES --------
+def _load_cube(dataset, name, version, build):
+    path = os.path.join(AGGREGATE_DIR, f"{name}-{version[:16]}.parquet")
+
+    def load():
+        try:
+            return pd.read_parquet(path)
+        except (ImportError, OSError, ValueError):
+            pass
+        cube = build()
+        os.makedirs(AGGREGATE_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            cube.to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+        except ImportError:
+            pass
+        return cube
+
+    return memoized(("cube", dataset, name), version, load)
+
+
+def load_stress_cube(path=STRESS_DATASET):
+    # Age x Gender x stress_type over the cleaned Stress_Dataset
+    def build():
+        df = load_stress_dataset(path)
+        with span("preprocess"):
+            return build_cube(df, STRESS_DIMENSIONS)
+
+    return _load_cube(path, f"{dataset_name(path)}-demographics", dataset_version(path), build)
+
+
+def load_stress_level_cube(path=STRESS_LEVEL_DATASET, params=None):
+    # stress_level x cluster; versioned by the clustering artifact it depends on
+    from clustering import RISK_GROUP_PARAMS, load_risk_groups
+    from model_registry import registry_key
+
+    params = params or RISK_GROUP_PARAMS
+    risk_groups = load_risk_groups(path, params)
+    version = registry_key(dataset_version(path), params)
+
+    def build():
+        df = load_stress_level_dataset(path)
+        with span("preprocess"):
+            return build_cube(df.assign(cluster=risk_groups["labels"]), STRESS_LEVEL_DIMENSIONS)
+
+    return _load_cube(path, f"{dataset_name(path)}-clusters", version, build)
@@ -0,0 +1,80 @@
+import numpy as np
+
+from data_store import STRESS_LEVEL_DATASET, memoized
+from feature_store import load_feature_store
+from model_registry import OOF_PARAMS, load_oof_predictions, registry_key
+
+
+class ScoreIndex:
+    """Students sorted by their probability of the high-stress class.
+
+    Threshold and top-N queries are binary searches over the sorted scores.
+    Flag counts, precision and recall are precomputed for every possible
+    cut, so a query never rescans the population. Cuts only fall between
+    distinct scores, so tied students are always flagged together.
+    """
+
+    def __init__(self, scores, positive):
+        scores = np.asarray(scores, dtype=np.float64)
+        positive = np.asarray(positive, dtype=bool)
+        # highest score first; ties keep row order
+        self.order = np.argsort(-scores, kind="stable")
+        self.sorted_scores = scores[self.order]
+        self._ascending = self.sorted_scores[::-1]
+        self.n = len(scores)
+        self.n_positive = int(positive.sum())
+        # true positives among the first k flagged, for k = 0..n
+        self.true_positives = np.concatenate([[0], np.cumsum(positive[self.order])])
+
+    def count_at_least(self, threshold):
+        # students with score >= threshold
+        return self.n - int(np.searchsorted(self._ascending, threshold, side="left"))
+
+    def flagged(self, threshold):
+        # row positions with score >= threshold, highest score first
+        return self.order[: self.count_at_least(threshold)]
+
+    def top(self, n):
+        # the n highest-scoring rows plus everyone tied with the last of them,
+        # and the score that cut corresponds to; may return more than n rows
+        n = max(0, min(int(n), self.n))
+        if not n:
+            return self.order[:0], 1.0
+        threshold = float(self.sorted_scores[n - 1])
+        return self.flagged(threshold), threshold
+
+    def precision_recall(self, count):
+        # of the first `count` students in score order
+        tp = int(self.true_positives[count])
+        precision = tp / count if count else float("nan")
+        recall = tp / self.n_positive if self.n_positive else float("nan")
+        return precision, recall
+
+    def mask(self, rows):
+        flags = np.zeros(self.n, dtype=bool)
+        flags[rows] = True
+        return flags
+
+    def curves(self):
+        # flag count, precision and recall at every distinct score threshold
+        last_of_tie = np.flatnonzero(np.diff(self.sorted_scores, append=-np.inf) != 0)
+        counts = last_of_tie + 1
+        tp = self.true_positives[counts]
+        return {
+            "threshold": self.sorted_scores[last_of_tie],
+            "flagged": counts,
+            "precision": tp / counts,
+            "recall": tp / max(self.n_positive, 1),
+        }
+
+
+def load_score_index(path=STRESS_LEVEL_DATASET, params=OOF_PARAMS):
+    # scores are the out-of-fold probabilities of the highest stress level
+    store = load_feature_store(path)
+    oof = load_oof_predictions(path, params)
+
+    def build():
+        high = oof["proba"][:, -1]
+        return ScoreIndex(high, np.asarray(store.target) == oof["classes"][-1])
+
+    return memoized(("score_index", path), registry_key(store.version, params), build)
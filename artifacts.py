@@ -0,0 +1,223 @@
+"""Derived artifacts of the two survey datasets, what each is computed from, and their refresh.
+
+Every artifact's loader already keys its caches by the versions of its
+inputs (dataset content hash, feature-store version, registry key), so a
+change to one CSV only invalidates what is downstream of it: a new
+Stress_Dataset.csv rebuilds its summaries, screening and cubes but leaves
+the StressLevelDataset models untouched. This module makes the graph
+explicit so that, once the app opts in, a changed file is reprocessed in
+a background thread: the new snapshot and every affected artifact are
+built first and published together, and until then pages keep serving
+the previous, consistent version.
+"""
+import os
+import threading
+import time
+
+import data_store
+from data_store import STRESS_DATASET, STRESS_LEVEL_DATASET, load_entry, pending_entry, publish_entry
+
+
+def _dataset_of(path):
+    # partition files are named after their dataset, like the flat CSVs
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class Artifact:
+    def __init__(self, name, dataset, inputs, load):
+        self.name = name
+        self.dataset = _dataset_of(dataset)
+        self.inputs = inputs
+        # load(path) builds (or fetches) the artifact for the dataset file at path
+        self.load = load
+
+    def __repr__(self):
+        return f"Artifact({self.dataset}/{self.name})"
+
+
+# -------- LOADERS --------
+# imported on use: the graph is declared at page start, most artifacts are built later
+def _clean_frame(path):
+    return data_store.load_stress_dataset(path)
+
+
+def _summary(path, clean=False):
+    from summaries import load_summary
+
+    return load_summary(path, clean=clean)
+
+
+def _histograms(path, clean=False):
+    from histograms import load_histograms
+
+    return load_histograms(path, clean=clean)
+
+
+def _comoments(path, clean=False):
+    from correlations import load_comoments
+
+    return load_comoments(path, clean=clean)
+
+
+def _frame_index(path, clean=False):
+    from filter_index import load_frame_index
+
+    return load_frame_index(path, clean=clean)
+
+
+def _demographics_cube(path):
+    from aggregates import load_stress_cube
+
+    return load_stress_cube(path)
+
+
+def _chi_square(path):
+    from chi_square import load_chi_square
+
+    return load_chi_square(path)
+
+
+def _feature_store(path):
+    from feature_store import load_feature_store
+
+    return load_feature_store(path)
+
+
+def _oof_predictions(path):
+    from model_registry import load_oof_predictions
+
+    return load_oof_predictions(path)
+
+
+def _score_index(path):
+    from alert_scores import load_score_index
+
+    return load_score_index(path)
+
+
+def _k_selection(path):
+    from clustering import RISK_GROUP_PARAMS
+    from k_selection import load_k_selection
+
+    return load_k_selection(RISK_GROUP_PARAMS, path)
+
+
+def _risk_groups(path):
+    # the page's default number of groups; other choices are built when picked
+    from clustering import load_risk_groups, risk_group_params
+
+    return load_risk_groups(path, risk_group_params(path))
+
+
+def _risk_group_cube(path):
+    from aggregates import load_stress_level_cube
+    from clustering import risk_group_params
+
+    return load_stress_level_cube(path, risk_group_params(path))
+
+
+# -------- GRAPH --------
+ARTIFACTS = [
+    # Stress_Dataset.csv
+    Artifact("summary", STRESS_DATASET, [], _summary),
+    Artifact("clean_frame", STRESS_DATASET, [], _clean_frame),
+    Artifact("clean_summary", STRESS_DATASET, ["clean_frame"], lambda p: _summary(p, clean=True)),
+    Artifact("histograms", STRESS_DATASET, ["clean_frame"], lambda p: _histograms(p, clean=True)),
+    Artifact("comoments", STRESS_DATASET, ["clean_frame"], lambda p: _comoments(p, clean=True)),
+    Artifact("frame_index", STRESS_DATASET, ["clean_frame"], lambda p: _frame_index(p, clean=True)),
+    Artifact("demographics_cube", STRESS_DATASET, ["clean_frame"], _demographics_cube),
+    Artifact("chi_square", STRESS_DATASET, ["clean_frame"], _chi_square),
+    # StressLevelDataset.csv
+    Artifact("summary", STRESS_LEVEL_DATASET, [], _summary),
+    Artifact("histograms", STRESS_LEVEL_DATASET, [], _histograms),
+    Artifact("comoments", STRESS_LEVEL_DATASET, [], _comoments),
+    Artifact("frame_index", STRESS_LEVEL_DATASET, [], _frame_index),
+    Artifact("feature_store", STRESS_LEVEL_DATASET, [], _feature_store),
+    # no page serves the single alert model: score_alerts.py builds it (and its
+    # compiled forest) on demand, so a refresh does not train it
+    Artifact("oof_predictions", STRESS_LEVEL_DATASET, ["feature_store"], _oof_predictions),
+    Artifact("score_index", STRESS_LEVEL_DATASET, ["oof_predictions"], _score_index),
+    Artifact("k_selection", STRESS_LEVEL_DATASET, ["feature_store"], _k_selection),
+    Artifact("risk_groups", STRESS_LEVEL_DATASET, ["k_selection"], _risk_groups),
+    Artifact("risk_group_cube", STRESS_LEVEL_DATASET, ["risk_groups"], _risk_group_cube),
+]
+
+
+def affected(path, artifacts=ARTIFACTS):
+    """Artifacts computed from the dataset file at path, inputs before dependents."""
+    nodes = {a.name: a for a in artifacts if a.dataset == _dataset_of(path)}
+    ordered, seen = [], set()
+
+    def visit(artifact):
+        if artifact.name in seen:
+            return
+        seen.add(artifact.name)
+        for dep in artifact.inputs:
+            visit(nodes[dep])
+        ordered.append(artifact)
+
+    for artifact in nodes.values():
+        visit(artifact)
+    return ordered
+
+
+# -------- BACKGROUND REFRESH --------
+_refreshing = {}
+_status = {}
+_lock = threading.Lock()
+
+
+def refresh(path):
+    """Rebuild path's snapshot and affected artifacts, then publish them together.
+
+    Runs in the calling thread. An artifact that fails to build is recorded
+    in status() and left to be rebuilt (and its error shown) on its next use.
+    """
+    started = time.time()
+    entry = load_entry(path)
+    errors = {}
+    with pending_entry(path, entry):
+        for artifact in affected(path):
+            try:
+                artifact.load(path)
+            except Exception as e:
+                errors[artifact.name] = repr(e)
+    publish_entry(path, entry)
+    return {"version": entry["version"], "started": started, "seconds": time.time() - started, "errors": errors}
+
+
+def _run(path):
+    try:
+        result = refresh(path)
+    except Exception as e:
+        result = {"error": repr(e)}
+    with _lock:
+        _status[path] = result
+        _refreshing.pop(path, None)
+
+
+def _schedule(path):
+    # called by data_store under its lock: only start a thread, at most one per file
+    with _lock:
+        if path in _refreshing:
+            return
+        thread = threading.Thread(target=_run, args=(path,), name=f"refresh {path}", daemon=True)
+        _refreshing[path] = time.time()
+    thread.start()
+
+
+def enable_background_refresh():
+    # from now on, a changed dataset file is served stale while it is reprocessed
+    data_store._on_change = _schedule
+
+
+def refreshing():
+    """Files being reprocessed, with the time their refresh started."""
+    with _lock:
+        return dict(_refreshing)
+
+
+def status():
+    """The last refresh result of each file."""
+    with _lock:
+        return dict(_status)
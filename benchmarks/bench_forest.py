@@ -0,0 +1,94 @@
+"""Compiled forest vs sklearn: single-student latency, batch throughput and exactness.
+
+Scores rows of StressLevelDataset.csv (tiled for the larger batches) with the
+registered alerts Random Forest through sklearn's predict/predict_proba and
+through CompiledForest, and checks the two agree bit for bit. Exits with
+status 1 on any mismatch.
+
+Examples:
+    python benchmarks/bench_forest.py
+    python benchmarks/bench_forest.py --batches 100 1000 --repeat 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+
+def _median_seconds(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def _format_time(seconds):
+    return f"{seconds * 1e6:9.1f}µs" if seconds < 1e-3 else f"{seconds * 1e3:9.1f}ms"
+
+
+def run(batches, repeat):
+    import numpy as np
+
+    from compiled_forest import load_compiled_alert_model
+    from feature_store import load_feature_store
+    from model_registry import load_alert_model
+
+    model = load_alert_model()
+    forest = load_compiled_alert_model()
+    store = load_feature_store()
+    features = np.asarray(store.raw[:, store.column_index(store.feature_columns)], dtype=np.float64)
+    rf, scaler = model["model"], model["scaler"]
+
+    def sklearn_proba(X):
+        return rf.predict_proba(scaler.transform(X))
+
+    def sklearn_predict(X):
+        return rf.predict(scaler.transform(X))
+
+    ok = True
+    print(f"forest: {forest.n_trees} trees, depth {forest.depth}, {len(forest.threshold)} nodes")
+
+    # one student at a time, as an inspector or scoring endpoint would ask
+    rows = [features[i:i + 1] for i in range(0, len(features), max(1, len(features) // repeat))][:repeat]
+    ok &= all(np.array_equal(sklearn_proba(row), forest.predict_proba(row)) for row in rows)
+    for name, reference, compiled in (
+        ("predict_proba", sklearn_proba, forest.predict_proba),
+        ("predict", sklearn_predict, forest.predict),
+    ):
+        slow = statistics.median(_median_seconds(lambda: reference(row), 1) for row in rows)
+        fast = statistics.median(_median_seconds(lambda: compiled(row), 1) for row in rows)
+        print(f"single row  {name:<14} sklearn={_format_time(slow)} compiled={_format_time(fast)} ({slow / fast:.0f}x)")
+
+    for size in batches:
+        X = np.resize(features, (size, features.shape[1]))
+        same = np.array_equal(sklearn_proba(X), forest.predict_proba(X))
+        same &= np.array_equal(sklearn_predict(X), forest.predict(X))
+        ok &= bool(same)
+        runs = max(1, min(repeat, 10))
+        slow = _median_seconds(lambda: sklearn_proba(X), runs)
+        fast = _median_seconds(lambda: forest.predict_proba(X), runs)
+        print(
+            f"batch {size:<9} predict_proba  sklearn={_format_time(slow)} compiled={_format_time(fast)} "
+            f"({slow / fast:.1f}x) {'exact' if same else 'MISMATCH'}"
+        )
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batches", type=int, nargs="+", default=[10, 100, 500, 1000, 10_000])
+    parser.add_argument("--repeat", type=int, default=100, help="single-row calls per method")
+    args = parser.parse_args(argv)
+    # dataset paths and the artifact cache are relative to the repo, as for the app
+    os.chdir(REPO)
+    return 0 if run(args.batches, args.repeat) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""Headless page benchmarks: cold start, warm rerun, widget interactions and peak memory.
+
+Each page runs through Streamlit's AppTest in a fresh process against copies
+of both CSVs tiled 10x/100x/1000x, with an empty artifact cache.
+
+Examples:
+    python benchmarks/bench_pages.py --scales 10 100
+    python benchmarks/bench_pages.py --compare benchmarks/results/a.json benchmarks/results/b.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO, "benchmarks", "results")
+SCALED_DIR = os.path.join(REPO, ".cache", "bench")
+
+PAGES = [
+    "visualization.py",
+    "pages/alerts.py",
+    "pages/distribution.py",
+    "pages/recommendation.py",
+    "pages/risk_groups.py",
+    "pages/feature_screening.py",
+]
+
+# page -> [(interaction name, widget type, key or position, value or option index)]
+INTERACTIONS = {
+    "pages/alerts.py": [
+        ("rule_threshold", "slider", "rule_threshold", 1),
+        ("ml_threshold", "slider", "ml_threshold", 0.3),
+        ("ml_top_n", "radio", "ml_mode", "Top N most at risk"),
+    ],
+    "pages/distribution.py": [
+        ("histogram_column_tab1", "selectbox", "hist_tab1", 3),
+        ("histogram_column_tab2", "selectbox", "hist_tab2", 3),
+        ("filter_range_tab2", "slider", "slider_tab2_anxiety_level", (5.0, 10.0)),
+        ("filter_columns_tab2", "multiselect", "filter_tab2", ["anxiety_level", "depression"]),
+    ],
+    "pages/recommendation.py": [
+        ("stress_type", "selectbox", 0, 2),
+    ],
+    "pages/risk_groups.py": [
+        ("risk_group", "selectbox", 0, 2),
+        ("n_groups", "select_slider", "n_groups", 3),
+    ],
+    "pages/feature_screening.py": [
+        ("alpha", "select_slider", "alpha", 0.01),
+    ],
+}
+
+
+# -------- DATA --------
+def scaled_data_dir(scale):
+    import pandas as pd
+
+    directory = os.path.join(SCALED_DIR, f"x{scale}")
+    os.makedirs(directory, exist_ok=True)
+    for name in ("Stress_Dataset.csv", "StressLevelDataset.csv"):
+        target = os.path.join(directory, name)
+        if not os.path.exists(target):
+            df = pd.read_csv(os.path.join(REPO, name))
+            pd.concat([df] * scale, ignore_index=True).to_csv(target, index=False)
+    return directory
+
+
+# -------- CHILD PROCESS --------
+def _widget(at, kind, ref):
+    widgets = getattr(at, kind)
+    return widgets(key=ref) if isinstance(ref, str) else widgets[ref]
+
+
+def _timed_run(at):
+    started = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - started
+    errors = [e.value for e in at.exception]
+    if errors:
+        raise RuntimeError(errors[0])
+    return elapsed
+
+
+def run_page(page, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(REPO, page), default_timeout=timeout)
+    result = {"cold_seconds": _timed_run(at), "warm_seconds": _timed_run(at), "interactions": {}}
+    for name, kind, ref, value in INTERACTIONS.get(page, []):
+        widget = _widget(at, kind, ref)
+        if kind == "selectbox":
+            value = widget.options[value]
+        widget.set_value(value)
+        result["interactions"][name] = _timed_run(at)
+    # ru_maxrss is in KiB on Linux
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+
+def _child(page, timeout):
+    sys.path.insert(0, REPO)
+    print(json.dumps(run_page(page, timeout)))
+
+
+# -------- DRIVER --------
+def bench_page(page, data_dir, timeout):
+    cache = os.path.join(data_dir, ".cache")
+    shutil.rmtree(cache, ignore_errors=True)
+    env = dict(os.environ, STRESS_MONITOR_CACHE=cache)
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", page, "--timeout", str(timeout)],
+        cwd=data_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO, capture_output=True, text=True
+        )
+        return out.stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def run_suite(scales, pages, timeout):
+    records = []
+    for scale in scales:
+        data_dir = scaled_data_dir(scale)
+        for page in pages:
+            result = bench_page(page, data_dir, timeout)
+            records.append({"page": page, "scale": scale, **result})
+            print(_format_record(records[-1]), flush=True)
+    return {
+        "commit": git_commit(),
+        "created": time.time(),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "records": records,
+    }
+
+
+def _format_record(record):
+    if "error" in record:
+        return f"{record['page']:<26} x{record['scale']:<5} ERROR {record['error']}"
+    interactions = " ".join(f"{k}={v:.3f}s" for k, v in record["interactions"].items())
+    return (
+        f"{record['page']:<26} x{record['scale']:<5} cold={record['cold_seconds']:.3f}s "
+        f"warm={record['warm_seconds']:.3f}s peak={record['peak_rss_mb']:.0f}MB {interactions}"
+    )
+
+
+# -------- COMPARISON --------
+def _metrics(record):
+    if "error" in record:
+        return {}
+    metrics = {
+        "cold_seconds": record["cold_seconds"],
+        "warm_seconds": record["warm_seconds"],
+        "peak_rss_mb": record["peak_rss_mb"],
+    }
+    metrics.update({f"interaction:{k}": v for k, v in record["interactions"].items()})
+    return metrics
+
+
+def compare(baseline_path, candidate_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+    before = {(r["page"], r["scale"]): _metrics(r) for r in baseline["records"]}
+    print(f"baseline {baseline['commit']} -> candidate {candidate['commit']}")
+    for record in candidate["records"]:
+        old = before.get((record["page"], record["scale"]), {})
+        for metric, value in _metrics(record).items():
+            if metric in old and old[metric]:
+                ratio = value / old[metric]
+                print(f"{record['page']:<26} x{record['scale']:<5} {metric:<34} "
+                      f"{old[metric]:>10.3f} -> {value:>10.3f}  ({ratio:.2f}x)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--pages", nargs="+", default=PAGES, choices=PAGES)
+    parser.add_argument("--timeout", type=float, default=600, help="seconds per script run")
+    parser.add_argument("--output", default=None, help="results file (default: benchmarks/results/)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"))
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args.child, args.timeout)
+        return 0
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    results = run_suite(args.scales, args.pages, args.timeout)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{results['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
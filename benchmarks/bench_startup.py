@@ -0,0 +1,119 @@
+"""Import-time startup benchmark per page, with budgets.
+
+Runs the module-level imports of each script in a fresh interpreter under
+`python -X importtime`, repeats, and takes the median. Streamlit itself is
+imported first and reported separately, so the budget covers what each page
+adds on top of it. Budgets are multiples of streamlit's own import time in
+the same runs, so they hold on faster and slower machines.
+
+Exits with status 1 when a page exceeds its budget or pulls in one of
+LAZY_MODULES at import time; those are only needed once a chart is drawn
+or a model is trained, and each costs 0.5-1s on its own.
+tests/test_startup.py runs the same checks under pytest.
+
+Example:
+    python benchmarks/bench_startup.py --repeat 7
+"""
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# import time a page may add on top of streamlit, as a multiple of streamlit's
+# own: pandas and numpy alone are ~1.0-1.3x, eager plotting libraries ~5x
+BUDGETS = {
+    "visualization.py": 2.0,
+    "pages/alerts.py": 2.0,
+    "pages/distribution.py": 2.0,
+    "pages/recommendation.py": 2.0,
+    "pages/risk_groups.py": 2.0,
+    "pages/feature_screening.py": 2.0,
+}
+LAZY_MODULES = ("matplotlib", "seaborn", "sklearn", "scipy", "joblib")
+
+
+def module_imports(page):
+    # the import statements a script runs at module level (not inside functions)
+    with open(os.path.join(REPO, page)) as f:
+        tree = ast.parse(f.read())
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def _parse_importtime(stderr):
+    # "import time: self [us] | cumulative | imported package"; top-level
+    # imports have no indentation in the package column. Interpreter startup
+    # (site, encodings) finishes before streamlit, the script's first import.
+    totals = {}
+    modules = set()
+    started = False
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if started:
+            modules.add(name.strip())
+        if name.startswith(" ") and not name.startswith("  "):
+            if started:
+                totals[name.strip()] = int(cumulative)
+            started = started or name.strip() == "streamlit"
+    return totals, modules
+
+
+def measure(page):
+    statements = module_imports(page)
+    script = "import streamlit\n" + "\n".join(s for s in statements if s != "import streamlit as st")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=REPO,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    totals, modules = _parse_importtime(proc.stderr)
+    streamlit_us = sum(
+        int(line.split("|")[1]) for line in proc.stderr.splitlines() if line.endswith("| streamlit")
+    )
+    return streamlit_us / 1000, sum(totals.values()) / 1000, totals, modules
+
+
+def eager_modules(modules):
+    # only modules finished after streamlit are listed, so its own imports do not count
+    return sorted(m for m in modules if m in LAZY_MODULES)
+
+
+def run(pages, repeat):
+    failures = []
+    for page in pages:
+        runs = [measure(page) for _ in range(repeat)]
+        streamlit_ms = statistics.median(r[0] for r in runs)
+        page_ms = statistics.median(r[1] for r in runs)
+        heaviest = sorted(runs[-1][2].items(), key=lambda kv: kv[1], reverse=True)[:3]
+        eager = eager_modules(runs[-1][3])
+        budget = BUDGETS[page] * streamlit_ms
+        status = "ok" if page_ms <= budget else "OVER BUDGET"
+        if eager:
+            status = "EAGER " + ",".join(eager)
+        print(
+            f"{page:<26} page={page_ms:7.1f}ms budget={budget:7.1f}ms streamlit={streamlit_ms:7.1f}ms "
+            f"{status}  heaviest: " + ", ".join(f"{name}={us / 1000:.0f}ms" for name, us in heaviest)
+        )
+        if status != "ok":
+            failures.append(page)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="+", default=list(BUDGETS), choices=list(BUDGETS))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    return 1 if run(args.pages, args.repeat) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
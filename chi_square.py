@@ -0,0 +1,163 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_store import (
+    CACHE_DIR,
+    STRESS_DATASET,
+    dataset_name,
+    dataset_version,
+    load_stress_dataset,
+    memoized,
+)
+from timings import span
+
+SCREENING_DIR = os.path.join(CACHE_DIR, "chi_square")
+
+TARGET = "stress_type"
+BLOCK_COLUMNS = 64
+# below this many cells starting worker processes costs more than it saves
+PARALLEL_MIN_CELLS = 4_000_000
+
+
+# -------- ENCODING --------
+def encode_column(values):
+    # small non-negative integers (the uint8 survey items) are their own codes;
+    # anything else is factorized
+    values = np.asarray(values)
+    if values.dtype.kind in "iu" and len(values) and values.min() >= 0 and values.max() < 1024:
+        return values, int(values.max()) + 1
+    codes, uniques = pd.factorize(values, sort=True)
+    if (codes < 0).any():
+        raise ValueError("chi-square screening does not handle missing values")
+    return codes.astype(np.min_scalar_type(max(len(uniques) - 1, 0))), len(uniques)
+
+
+def encode(df, columns):
+    """Codes matrix (columns x rows, smallest integer dtype) and the level count of each column.
+
+    Columns are the leading axis so each one stays contiguous, as in the frame.
+    """
+    encoded = [encode_column(df[col].to_numpy()) for col in columns]
+    codes = np.stack([c for c, _ in encoded]) if encoded else np.empty((0, len(df)), np.uint8)
+    return codes, np.array([n for _, n in encoded], dtype=np.int64)
+
+
+# -------- STATISTICS --------
+def contingency_tables(codes, n_levels, target_codes, n_classes):
+    """Every column's level x class table from a single bincount.
+
+    Row i of column j lands in cell (j, codes[j, i], target_codes[i]) of an
+    array padded to the widest column, so the counting is one pass over the
+    matrix. Returns an int array of shape (columns, max levels, classes).
+    """
+    n_cols = codes.shape[0]
+    width = int(n_levels.max()) if n_cols else 1
+    flat = codes.astype(np.intp)
+    flat += (np.arange(n_cols, dtype=np.intp) * width)[:, None]
+    flat *= n_classes
+    flat += target_codes
+    counts = np.bincount(flat.ravel(), minlength=n_cols * width * n_classes)
+    return counts.reshape(n_cols, width, n_classes)
+
+
+def chi2_from_tables(tables, correction=True):
+    """Pearson chi-square statistic, degrees of freedom, sample size and
+    min(levels, classes) - 1 (for Cramér's V) of each table.
+
+    Matches scipy.stats.chi2_contingency on the crosstab of each column:
+    levels or classes absent from a table are dropped, and Yates'
+    correction is applied when a table has one degree of freedom.
+    """
+    tables = tables.astype(np.float64)
+    row_sums = tables.sum(axis=2, keepdims=True)
+    col_sums = tables.sum(axis=1, keepdims=True)
+    n = row_sums.sum(axis=(1, 2), keepdims=True)
+    expected = row_sums * col_sums / np.where(n > 0, n, 1)
+
+    rows = (row_sums[:, :, 0] > 0).sum(axis=1)
+    cols = (col_sums[:, 0, :] > 0).sum(axis=1)
+    dof = (rows - 1) * (cols - 1)
+
+    diff = tables - expected
+    if correction:
+        yates = (dof == 1)[:, None, None]
+        diff = np.where(yates, np.sign(diff) * np.maximum(np.abs(diff) - 0.5, 0), diff)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = np.where(expected > 0, diff ** 2 / expected, 0.0)
+    return terms.sum(axis=(1, 2)), dof, n[:, 0, 0], np.minimum(rows, cols) - 1
+
+
+def _screen_block(codes, n_levels, target_codes, n_classes):
+    tables = contingency_tables(codes, n_levels, target_codes, n_classes)
+    return chi2_from_tables(tables)
+
+
+def chi_square_screen(df, target=TARGET, columns=None, workers=None):
+    """Chi-square test of independence of every column against target.
+
+    Returns one row per feature with the statistic, p-value, degrees of
+    freedom and Cramér's V, sorted by p-value. Large inputs are split into
+    column blocks counted in a process pool.
+    """
+    from scipy.special import chdtrc
+
+    if columns is None:
+        columns = [c for c in df.columns if c != target]
+    target_codes, classes = pd.factorize(df[target], sort=True)
+    keep = target_codes >= 0
+    codes, n_levels = encode(df[keep], columns)
+    target_codes = target_codes[keep].astype(np.intp)
+    n_classes = len(classes)
+
+    blocks = [slice(i, i + BLOCK_COLUMNS) for i in range(0, len(columns), BLOCK_COLUMNS)]
+    args = [(codes[b], n_levels[b], target_codes, n_classes) for b in blocks]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(blocks) > 1 and codes.size >= PARALLEL_MIN_CELLS:
+        with ProcessPoolExecutor(min(workers, len(blocks))) as pool:
+            parts = list(pool.map(_screen_block, *zip(*args)))
+    else:
+        parts = [_screen_block(*a) for a in args]
+
+    if parts:
+        stat, dof, n, k = (np.concatenate(p) for p in zip(*parts))
+    else:
+        stat, dof, n, k = np.empty(0), np.empty(0, np.int64), np.empty(0), np.empty(0, np.int64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p_value = np.where(dof > 0, chdtrc(np.maximum(dof, 1), stat), np.nan)
+        cramers_v = np.sqrt(stat / (n * np.where(k > 0, k, np.nan)))
+    result = pd.DataFrame(
+        {
+            "feature": columns,
+            "chi2": stat,
+            "p_value": p_value,
+            "dof": dof,
+            "cramers_v": cramers_v,
+        }
+    )
+    return result.sort_values("p_value", kind="stable").reset_index(drop=True)
+
+
+# -------- CACHE --------
+def load_chi_square(path=STRESS_DATASET, target=TARGET):
+    # screening of the cleaned Stress_Dataset, stored per dataset version
+    version = dataset_version(path)
+    cache_path = os.path.join(SCREENING_DIR, f"{dataset_name(path)}-{target}-{version[:16]}.csv")
+
+    def build():
+        try:
+            return pd.read_csv(cache_path)
+        except (OSError, ValueError):
+            pass
+        df = load_stress_dataset(path)
+        with span("preprocess"):
+            result = chi_square_screen(df, target)
+        os.makedirs(SCREENING_DIR, exist_ok=True)
+        tmp = f"{cache_path}.{os.getpid()}.tmp"
+        result.to_csv(tmp, index=False)
+        os.replace(tmp, cache_path)
+        return result
+
+    return memoized(("chi_square", path, target), version, build)
@@ -0,0 +1,241 @@
+"""Risk groups: K-Means clusters of students, ranked by their mean stress_level.
+
+Clusters are fitted on the survey features only, so new responses without
+a stress_level can be placed in a group; stress_level just orders them.
+
+Example:
+    python clustering.py ingest new_responses.csv --output placed.csv
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from data_store import STRESS_LEVEL_DATASET, dataset_name
+from feature_store import load_feature_store
+from k_selection import load_k_selection
+from model_registry import MODEL_DIR, get_or_train, registry_key
+from timings import span
+
+RISK_LABELS = ["Low risk", "Medium risk", "High risk"]
+
+RISK_GROUP_PARAMS = {
+    # "features": the survey items, without the stress_level target
+    "columns": "features",
+    "n_clusters": 3,
+    "random_state": 42,
+    "n_init": "auto",
+}
+
+
+def risk_labels(n_clusters):
+    # lowest to highest risk; tiers between low and high are numbered when k != 3
+    if n_clusters == 3:
+        return list(RISK_LABELS)
+    middle = [f"Medium risk {i}" for i in range(1, n_clusters - 1)]
+    return ["Low risk"] + middle + ["High risk"]
+
+
+def risk_group_params(path=STRESS_LEVEL_DATASET):
+    # RISK_GROUP_PARAMS with n_clusters taken from the cached k sweep
+    selection = load_k_selection(RISK_GROUP_PARAMS, path)
+    return {**RISK_GROUP_PARAMS, "n_clusters": selection["best_k"]}
+
+
+def risk_mapping_for(labels, target, n_clusters=None):
+    # clusters ranked by mean stress_level: lowest -> "Low risk", highest -> "High risk"
+    n_clusters = n_clusters or int(labels.max()) + 1
+    names = risk_labels(n_clusters)
+    sums = np.bincount(labels, weights=target, minlength=n_clusters)
+    sizes = np.bincount(labels, minlength=n_clusters)
+    order = np.argsort(sums / np.maximum(sizes, 1), kind="stable")
+    return {int(cluster): names[rank] for rank, cluster in enumerate(order)}
+
+
+def train_risk_groups(store, params=RISK_GROUP_PARAMS):
+    from sklearn.cluster import KMeans
+
+    kmeans = KMeans(
+        n_clusters=params["n_clusters"],
+        random_state=params["random_state"],
+        n_init=params["n_init"],
+    )
+    columns = store.feature_columns
+    with span("fit"):
+        labels = kmeans.fit_predict(store.scaled[:, store.column_index(columns)])
+    mapping = risk_mapping_for(labels, np.asarray(store.target, dtype=np.float64), params["n_clusters"])
+
+    return {
+        "columns": columns,
+        "scaler": store.scaler(columns),
+        "model": kmeans,
+        "centroids": kmeans.cluster_centers_,
+        "risk_mapping": mapping,
+        "labels": labels,
+        "risk_group": np.array([mapping[c] for c in range(len(mapping))])[labels],
+        "metrics": {"inertia": float(kmeans.inertia_)},
+    }
+
+
+def load_risk_groups(path=STRESS_LEVEL_DATASET, params=RISK_GROUP_PARAMS):
+    store = load_feature_store(path)
+    return get_or_train(
+        "risk_groups_kmeans",
+        store.version,
+        params,
+        lambda p: train_risk_groups(store, p),
+        dataset=dataset_name(path),
+    )
+
+
+# -------- ONLINE ASSIGNMENT --------
+class OnlineRiskGroups:
+    """Nearest-centroid risk assignment for new responses, with warm-started updates.
+
+    Rows are assigned against fixed centroids in O(k * d) each and buffered;
+    fold() moves every centroid to the running mean of all rows it has seen
+    (counts are seeded with the original cluster sizes). Cluster ids never
+    change, so the cluster -> risk label mapping of the base fit stays stable.
+    """
+
+    def __init__(self, base, fold_every=10_000):
+        self.columns = list(base["columns"])
+        self.scaler = base["scaler"]
+        self.centroids = np.array(base["centroids"], dtype=np.float64)
+        self.counts = np.bincount(base["labels"], minlength=len(self.centroids)).astype(np.int64)
+        self.risk_mapping = dict(base["risk_mapping"])
+        self.labels = np.array([self.risk_mapping[c] for c in range(len(self.centroids))])
+        self.fold_every = fold_every
+        self.n_folded = 0
+        self._buffer = []
+        self._buffered = 0
+
+    def _scale(self, rows):
+        missing = [c for c in self.columns if c not in rows.columns]
+        if missing:
+            raise ValueError(f"new responses are missing columns: {missing}")
+        X = rows[self.columns].to_numpy(dtype=np.float64)
+        return (X - self.scaler.mean_) / self.scaler.scale_
+
+    def _nearest(self, X):
+        # ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2; the ||x||^2 term does not change the argmin
+        dist = -2.0 * X @ self.centroids.T + (self.centroids ** 2).sum(axis=1)
+        return dist.argmin(axis=1)
+
+    def predict(self, rows):
+        return self._nearest(self._scale(rows))
+
+    def assign(self, rows, learn=True):
+        with span("scale"):
+            X = self._scale(rows)
+        with span("predict"):
+            clusters = self._nearest(X)
+        if learn:
+            self._buffer.append(X)
+            self._buffered += len(X)
+            if self._buffered >= self.fold_every:
+                self.fold()
+        return rows.assign(cluster=clusters, risk_group=self.labels[clusters])
+
+    def fold(self):
+        if not self._buffered:
+            return 0
+        X = np.concatenate(self._buffer)
+        clusters = self._nearest(X)
+        k, d = self.centroids.shape
+        batch_counts = np.bincount(clusters, minlength=k)
+        batch_sums = np.zeros((k, d))
+        np.add.at(batch_sums, clusters, X)
+
+        totals = self.counts + batch_counts
+        seen = batch_counts > 0
+        self.centroids[seen] = (
+            self.centroids[seen] * self.counts[seen, None] + batch_sums[seen]
+        ) / totals[seen, None]
+        self.counts = totals
+
+        folded = self._buffered
+        self.n_folded += folded
+        self._buffer, self._buffered = [], 0
+        return folded
+
+
+def _online_path(base_key):
+    return os.path.join(MODEL_DIR, "risk_groups_online", f"{base_key}.npz")
+
+
+def load_online_risk_groups(path=STRESS_LEVEL_DATASET, params=RISK_GROUP_PARAMS):
+    # the saved state is plain arrays on top of the base fit it was folded from
+    import zipfile
+
+    store = load_feature_store(path)
+    base = load_risk_groups(path, params)
+    online = OnlineRiskGroups(base)
+    try:
+        with np.load(_online_path(registry_key(store.version, params))) as state:
+            centroids, counts, n_folded = state["centroids"], state["counts"], int(state["n_folded"])
+    except (OSError, EOFError, ValueError, KeyError, zipfile.BadZipFile):
+        return online
+    if centroids.shape != online.centroids.shape or counts.shape != online.counts.shape:
+        return online
+    online.centroids = centroids.astype(np.float64)
+    online.counts = counts.astype(np.int64)
+    online.n_folded = n_folded
+    return online
+
+
+def save_online_risk_groups(online, path=STRESS_LEVEL_DATASET, params=RISK_GROUP_PARAMS):
+    # rows still in the buffer are not saved: fold() first
+    store = load_feature_store(path)
+    target = _online_path(registry_key(store.version, params))
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp.npz"
+    np.savez(tmp, centroids=online.centroids, counts=online.counts, n_folded=online.n_folded)
+    os.replace(tmp, target)
+
+
+def ingest_responses(csv_path, chunksize=100_000, path=STRESS_LEVEL_DATASET, params=RISK_GROUP_PARAMS):
+    # streams a file of new responses, yielding each chunk with its risk group;
+    # centroids are folded as the buffer fills and the state is saved at the end
+    import pandas as pd
+
+    online = load_online_risk_groups(path, params)
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        yield online.assign(chunk)
+    online.fold()
+    save_online_risk_groups(online, path, params)
+
+
+# -------- CLI --------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Place new survey responses in the current risk groups.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="assign a CSV of responses and fold them into the centroids")
+    ingest.add_argument("input", help="CSV with the survey feature columns; stress_level is not needed")
+    ingest.add_argument("--output", default=None, help="CSV to write every response with its risk group")
+    ingest.add_argument("--chunksize", type=int, default=100_000)
+    ingest.add_argument(
+        "--dataset",
+        default=STRESS_LEVEL_DATASET,
+        help="data file (or partition file) whose risk groups to use",
+    )
+    args = parser.parse_args(argv)
+
+    params = risk_group_params(args.dataset)
+    counts = {}
+    try:
+        for i, placed in enumerate(ingest_responses(args.input, args.chunksize, args.dataset, params)):
+            if args.output:
+                placed.to_csv(args.output, mode="w" if i == 0 else "a", header=i == 0, index=False)
+            for group, n in placed["risk_group"].value_counts().items():
+                counts[group] = counts.get(group, 0) + int(n)
+    except ValueError as e:
+        parser.error(str(e))
+    for group in risk_labels(params["n_clusters"]):
+        print(f"{group}: {counts.get(group, 0)} responses")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
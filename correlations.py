@@ -0,0 +1,203 @@
+import hashlib
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from data_store import (
+    CACHE_DIR,
+    dataset_name,
+    dataset_version,
+    load_stress_dataset,
+    memoized,
+    read_dataset,
+)
+from timings import span
+
+CORRELATION_DIR = os.path.join(CACHE_DIR, "correlations")
+
+
+class CoMoments:
+    """Running pairwise counts, means and co-moments of a set of numeric columns.
+
+    update() folds in a batch of rows with the pairwise (Chan et al.) merge,
+    so appended rows never require rescanning the history. Like
+    DataFrame.corr(), every pair of columns uses the rows where both are
+    present: entry [i, j] of n, mean and m2 describes column i over the
+    rows where i and j are present. Cached instances are shared: copy()
+    before updating one.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        # rows seen, with or without missing values, and the digest they were saved with
+        self.rows = 0
+        self.digest = ""
+        self.n = np.zeros((k, k))
+        self.mean = np.zeros((k, k))
+        self.m2 = np.zeros((k, k))
+        self.comoment = np.zeros((k, k))
+
+    def copy(self):
+        other = CoMoments(self.columns)
+        other.rows = self.rows
+        other.n, other.mean = self.n.copy(), self.mean.copy()
+        other.m2, other.comoment = self.m2.copy(), self.comoment.copy()
+        return other
+
+    def _merge(self, n_b, mean_b, m2_b, comoment_b):
+        n = self.n + n_b
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weight = np.where(n > 0, self.n * n_b / n, 0.0)
+            share = np.where(n > 0, n_b / n, 0.0)
+        delta = mean_b - self.mean
+        self.comoment += comoment_b + delta * delta.T * weight
+        self.m2 += m2_b + delta ** 2 * weight
+        self.mean += delta * share
+        self.n = n
+
+    def update(self, rows):
+        if isinstance(rows, pd.DataFrame):
+            rows = rows[self.columns]
+        X = np.asarray(rows, dtype=np.float64)
+        self.rows += len(X)
+        present = ~np.isnan(X)
+        if not present.any():
+            return self
+        # shifted by the column means for accuracy (co-moments do not change); 0 where missing
+        counts = present.sum(axis=0)
+        shift = np.where(present, X, 0.0).sum(axis=0) / np.maximum(counts, 1)
+        X = np.where(present, X - shift, 0.0)
+        M = present.astype(np.float64)
+        n_b = M.T @ M
+        # sums[i, j]: column i over the rows where i and j are both present
+        sums = X.T @ M
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_b = np.where(n_b > 0, sums / n_b, 0.0)
+        m2_b = (X ** 2).T @ M - sums * mean_b
+        comoment_b = X.T @ X - sums * mean_b.T
+        self._merge(n_b, np.where(n_b > 0, mean_b + shift[:, None], 0.0), m2_b, comoment_b)
+        return self
+
+    def merge(self, other):
+        if other.columns != self.columns:
+            raise ValueError("cannot merge co-moments over different columns")
+        self.rows += other.rows
+        self._merge(other.n, other.mean, other.m2, other.comoment)
+        return self
+
+    def variance(self):
+        n = np.diag(self.n)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return pd.Series(np.diag(self.m2) / (n - 1), index=self.columns)
+
+    def corr(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = self.comoment / np.sqrt(self.m2 * self.m2.T)
+        # pandas needs at least one complete pair, and a constant column has no correlation
+        corr[(self.n < 1) | (self.m2 == 0) | (self.m2.T == 0)] = np.nan
+        np.fill_diagonal(corr, np.where((np.diag(self.m2) > 0), 1.0, np.nan))
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+    def save(self, path, digest=""):
+        # digest identifies the rows folded in so far, for appending later
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp,
+            columns=np.array(self.columns),
+            rows=self.rows,
+            n=self.n,
+            mean=self.mean,
+            m2=self.m2,
+            comoment=self.comoment,
+            digest=np.array(digest),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        # files written before pairwise statistics lack m2 and raise KeyError
+        with np.load(path) as data:
+            comoments = cls(data["columns"].tolist())
+            comoments.rows = int(data["rows"])
+            comoments.n = data["n"]
+            comoments.mean = data["mean"]
+            comoments.m2 = data["m2"]
+            comoments.comoment = data["comoment"]
+            comoments.digest = str(data["digest"])
+        return comoments
+
+
+def top_columns(comoments, k=10, target=None):
+    # target given: the target plus the k-1 columns most correlated with it (|r|);
+    # otherwise the k columns with the largest variance
+    if target is not None and target in comoments.columns:
+        strength = comoments.corr()[target].drop(target).abs()
+        return [target] + strength.nlargest(k - 1).index.tolist()
+    return comoments.variance().nlargest(k).index.tolist()
+
+
+def _row_hashes(numeric):
+    # one hash per row, independent of how compactly the values are stored
+    return pd.util.hash_pandas_object(numeric.astype(np.float64), index=False).to_numpy()
+
+
+def _digest(row_hashes):
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()
+
+
+def _previous_comoments(prefix, exclude):
+    # the most recently written co-moments of another version of the same data
+    pattern = re.compile(re.escape(prefix) + r"-[0-9a-f]{16}\.npz")
+    try:
+        names = [n for n in os.listdir(CORRELATION_DIR) if pattern.fullmatch(n)]
+    except OSError:
+        return None
+    paths = [os.path.join(CORRELATION_DIR, n) for n in names]
+    for path in sorted((p for p in paths if p != exclude), key=os.path.getmtime, reverse=True):
+        try:
+            return CoMoments.load(path)
+        except (OSError, ValueError, KeyError):
+            continue
+    return None
+
+
+def load_comoments(path, clean=False):
+    """Co-moments of the dataset's numeric columns, stored per dataset version.
+
+    When a new version starts with exactly the rows of the last stored one
+    (rows were appended), only the new rows are folded in; any other
+    change rescans the file.
+    """
+    version = dataset_version(path)
+    suffix = "-clean" if clean else ""
+    prefix = f"{dataset_name(path)}{suffix}"
+    cache_path = os.path.join(CORRELATION_DIR, f"{prefix}-{version[:16]}.npz")
+
+    def build():
+        try:
+            return CoMoments.load(cache_path)
+        except (OSError, ValueError, KeyError):
+            pass
+        df = load_stress_dataset(path) if clean else read_dataset(path)
+        with span("preprocess"):
+            numeric = df.select_dtypes(include=[np.number])
+            # hashing rows is a small fraction of recomputing the co-moments
+            hashes = _row_hashes(numeric)
+            base = _previous_comoments(prefix, cache_path)
+            if (
+                base is not None
+                and base.columns == numeric.columns.tolist()
+                and base.rows <= len(numeric)
+                and base.digest == _digest(hashes[: base.rows])
+            ):
+                comoments = base.update(numeric.iloc[base.rows:])
+            else:
+                comoments = CoMoments(numeric.columns).update(numeric)
+        os.makedirs(CORRELATION_DIR, exist_ok=True)
+        comoments.save(cache_path, _digest(hashes))
+        return comoments
+
+    return memoized(("comoments", path, clean), version, build)
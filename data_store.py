@@ -0,0 +1,396 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from timings import span
+
+STRESS_DATASET = "Stress_Dataset.csv"
+STRESS_LEVEL_DATASET = "StressLevelDataset.csv"
+STRESS_TYPE_QUESTION = "Which type of stress do you primarily experience?"
+
+CACHE_DIR = os.environ.get("STRESS_MONITOR_CACHE", ".cache")
+# parsed frames kept in memory across datasets/partitions, least recently used evicted first
+MAX_RESIDENT_BYTES = int(os.environ.get("STRESS_MONITOR_MEMORY_MB", "1024")) * 1024 * 1024
+
+# Target dtypes per dataset ("*" covers every column not listed explicitly).
+# Survey items are small non-negative integers, stress_type is a few long labels.
+SCHEMAS = {
+    "Stress_Dataset": {"*": "uint8", STRESS_TYPE_QUESTION: "category"},
+    "StressLevelDataset": {"*": "uint8"},
+}
+
+# One parsed snapshot per dataset file, shared by every page and session of this
+# process. Frames handed out from here are shared: callers must not modify them in place.
+_snapshots = OrderedDict()
+_derived = {}
+_versions = {}
+_lock = threading.Lock()
+# memoized values kept per key: the version being served and the one being refreshed
+MAX_VERSIONS = 2
+
+# Set by artifacts.enable_background_refresh(): called (under _lock, so it must
+# only schedule work) with a path whose file changed while a snapshot of it is
+# being served. The snapshot keeps serving until the refresh publishes a new one.
+_on_change = None
+# snapshots a refresh thread is building, and the versions a script run has
+# pinned (see pin_versions), visible to that thread only
+_local = threading.local()
+
+
+# -------- SCHEMA --------
+def _base_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def dataset_name(path):
+    # partition files (<dataset>/institution=a/wave=b/<dataset>.parquet) are named
+    # after their dataset plus partition values, so their caches never collide
+    keys = [part.split("=", 1)[1] for part in os.path.normpath(path).split(os.sep)[:-1] if "=" in part]
+    return ".".join([_base_name(path), *keys])
+
+
+def frame_memory(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def apply_schema(df, schema):
+    columns = {}
+    for col in df.columns:
+        dtype = schema.get(col, schema.get("*"))
+        series = df[col]
+        if dtype is None or series.dtype == dtype:
+            continue
+        if dtype == "category":
+            columns[col] = series.astype("category")
+            continue
+        # keep the parsed dtype when the values do not fit, instead of wrapping
+        if not pd.api.types.is_integer_dtype(series.dtype) or series.empty:
+            continue
+        info = np.iinfo(dtype)
+        if series.min() >= info.min and series.max() <= info.max:
+            columns[col] = series.astype(dtype)
+    return df.assign(**columns) if columns else df
+
+
+def schema_for(path):
+    return SCHEMAS.get(_base_name(path), {})
+
+
+def compact_frame(df, path):
+    return apply_schema(df, schema_for(path))
+
+
+# -------- SNAPSHOT FILES --------
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _snapshot_paths(path):
+    name = dataset_name(path)
+    return (
+        os.path.join(CACHE_DIR, f"{name}.parquet"),
+        os.path.join(CACHE_DIR, f"{name}.json"),
+    )
+
+
+def _read_meta(path):
+    _, meta_path = _snapshot_paths(path)
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(path, stamp, digest, memory_before):
+    _, meta_path = _snapshot_paths(path)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f"{meta_path}.{os.getpid()}.tmp"
+    meta = {
+        "mtime_ns": stamp[0],
+        "size": stamp[1],
+        "sha256": digest,
+        "schema": schema_for(path),
+        "memory_before": memory_before,
+    }
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, meta_path)
+
+
+def _read_snapshot(path):
+    parquet_path, _ = _snapshot_paths(path)
+    try:
+        return pd.read_parquet(parquet_path)
+    except (ImportError, OSError, ValueError):
+        return None
+
+
+def _write_snapshot(path, df):
+    parquet_path, _ = _snapshot_paths(path)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f"{parquet_path}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmp, index=False)
+    except ImportError:
+        # pyarrow is optional: without it we only keep the in-memory snapshot
+        return False
+    os.replace(tmp, parquet_path)
+    return True
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _load_snapshot(path, stamp):
+    if path.endswith(".parquet"):
+        # partition files are written compact already: they are their own snapshot
+        df = pd.read_parquet(path)
+        return file_hash(path), compact_frame(df, path), frame_memory(df)
+
+    # mtime and size unchanged -> trust the on-disk snapshot without hashing;
+    # otherwise fall back to the content hash before reparsing the CSV.
+    meta = _read_meta(path)
+    if meta is not None and meta.get("schema") != schema_for(path):
+        meta = None
+    if meta is not None and (meta["mtime_ns"], meta["size"]) == stamp:
+        df = _read_snapshot(path)
+        if df is not None:
+            return meta["sha256"], df, meta.get("memory_before")
+
+    digest = file_hash(path)
+    if meta is not None and meta["sha256"] == digest:
+        df = _read_snapshot(path)
+        if df is not None:
+            memory_before = meta.get("memory_before")
+            _write_meta(path, stamp, digest, memory_before)
+            return digest, df, memory_before
+
+    df = pd.read_csv(path)
+    memory_before = frame_memory(df)
+    df = compact_frame(df, path)
+    if _write_snapshot(path, df):
+        _write_meta(path, stamp, digest, memory_before)
+    return digest, df, memory_before
+
+
+def _evict(path):
+    # drop a dataset's frame and everything memoized from it
+    _snapshots.pop(path, None)
+    _versions.pop(path, None)
+    for key in [k for k in _derived if path in k]:
+        del _derived[key]
+
+
+def _pending(path):
+    # a refresh thread's snapshot under construction, else this rerun's pinned one
+    pending = getattr(_local, "pending", {}).get(path)
+    if pending is None:
+        pending = getattr(_local, "pinned", {}).get(path)
+    return pending
+
+
+def load_entry(path):
+    # a fresh snapshot of the file as it is now, not yet served to anyone
+    stamp = _stamp(path)
+    with span("load"):
+        version, df, memory_before = _load_snapshot(path, stamp)
+    return {
+        "stamp": stamp,
+        "version": version,
+        "frame": df,
+        "memory_before": memory_before,
+        "memory_after": frame_memory(df),
+    }
+
+
+def publish_entry(path, entry):
+    # serve entry from now on; memoized values of older versions are dropped
+    with _lock:
+        _snapshots[path] = entry
+        _snapshots.move_to_end(path)
+        _versions.pop(path, None)
+        for key in [k for k in _derived if path in k]:
+            versions = _derived[key]
+            for version in list(versions)[:-1]:
+                del versions[version]
+        # memory follows the datasets (partitions) in use, not every one ever opened
+        while len(_snapshots) > 1 and sum(e["memory_after"] for e in _snapshots.values()) > MAX_RESIDENT_BYTES:
+            _evict(next(iter(_snapshots)))
+
+
+class pending_entry:
+    """Within this block, the current thread sees entry as path's snapshot.
+
+    Loaders called inside it compute and cache the next version of their
+    artifacts while every other thread keeps getting the served one.
+    """
+
+    def __init__(self, path, entry):
+        self.path, self.entry = path, entry
+
+    def __enter__(self):
+        if not hasattr(_local, "pending"):
+            _local.pending = {}
+        _local.pending[self.path] = self.entry
+        return self.entry
+
+    def __exit__(self, *exc):
+        _local.pending.pop(self.path, None)
+
+
+def _entry(path):
+    pending = _pending(path)
+    if pending is not None and "frame" in pending:
+        return pending
+    stamp = _stamp(path)
+    with _lock:
+        entry = _snapshots.get(path)
+        if entry is not None and entry["stamp"] == stamp:
+            _snapshots.move_to_end(path)
+            return entry
+        if entry is not None and _on_change is not None:
+            # stale keeps serving while the new version is built
+            _on_change(path)
+            return entry
+    if entry is not None and entry["version"] == file_hash(path):
+        with _lock:
+            entry["stamp"] = stamp
+        return entry
+    entry = load_entry(path)
+    publish_entry(path, entry)
+    return entry
+
+
+# -------- PUBLIC API --------
+def pin_versions(*paths, frames=True):
+    """Serve this thread the versions of paths current now, until it pins again.
+
+    Called once at the top of a script run: every loader after it resolves
+    the same snapshot, so a refresh published mid-run cannot mix the old
+    frame with new models. With frames=False only file versions are
+    pinned, for pages that read summaries and never parse the file.
+    """
+    # resolved afresh: the previous run's pins must not answer for themselves
+    _local.pinned = {}
+    pinned = {}
+    for path in paths:
+        if frames:
+            pinned[path] = _entry(path)
+        else:
+            pinned[path] = {"version": file_version(path)}
+    _local.pinned = pinned
+
+
+def read_dataset(path):
+    return _entry(path)["frame"]
+
+
+def dataset_version(path):
+    return _entry(path)["version"]
+
+
+def file_version(path):
+    # Same value as dataset_version() but without parsing the file, for
+    # readers that stream the CSV instead of using the in-memory snapshot.
+    pending = _pending(path)
+    if pending is not None:
+        return pending["version"]
+    stamp = _stamp(path)
+    with _lock:
+        entry = _snapshots.get(path)
+        if entry is not None and entry["stamp"] == stamp:
+            return entry["version"]
+        cached = _versions.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        served = entry["version"] if entry is not None else cached[1] if cached is not None else None
+        if served is not None and _on_change is not None:
+            _on_change(path)
+            return served
+    meta = _read_meta(path)
+    if meta is not None and (meta["mtime_ns"], meta["size"]) == stamp:
+        digest = meta["sha256"]
+    else:
+        digest = file_hash(path)
+    with _lock:
+        _versions[path] = (stamp, digest)
+    return digest
+
+
+def resident_paths():
+    # dataset paths this process is serving: a frame, version or memoized value
+    with _lock:
+        paths = set(_snapshots) | set(_versions)
+        for key in _derived:
+            paths.update(part for part in key if isinstance(part, str))
+    return paths
+
+
+def memory_report(paths=(STRESS_DATASET, STRESS_LEVEL_DATASET)):
+    rows = []
+    for path in paths:
+        entry = _entry(path)
+        before, after = entry["memory_before"], entry["memory_after"]
+        rows.append(
+            {
+                "dataset": dataset_name(path),
+                "rows": len(entry["frame"]),
+                "bytes_before": before,
+                "bytes_after": after,
+                "reduction": before / after if before and after else None,
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def memoized(key, version, build):
+    # in-process cache of values derived from a dataset, rebuilt when the version
+    # changes; keys hold the dataset path so they are evicted along with its frame
+    with _lock:
+        versions = _derived.get(key)
+        if versions is not None and version in versions:
+            return versions[version]
+    value = build()
+    with _lock:
+        versions = _derived.setdefault(key, OrderedDict())
+        versions[version] = value
+        while len(versions) > MAX_VERSIONS:
+            versions.popitem(last=False)
+    return value
+
+
+def clean_stress_dataset(df):
+    df = df.rename(columns={STRESS_TYPE_QUESTION: "stress_type"})
+    df = df[(df["Age"] >= 18) & (df["Age"] <= 21)]
+    if isinstance(df["stress_type"].dtype, pd.CategoricalDtype):
+        # value_counts() would otherwise list categories emptied by the age filter
+        df = df.assign(stress_type=df["stress_type"].cat.remove_unused_categories())
+    return df
+
+
+def load_stress_dataset(path=STRESS_DATASET, raw=False):
+    if raw:
+        return read_dataset(path)
+
+    def build():
+        df = read_dataset(path)
+        with span("preprocess"):
+            return clean_stress_dataset(df)
+
+    return memoized(("stress_dataset", path), dataset_version(path), build)
+
+
+def load_stress_level_dataset(path=STRESS_LEVEL_DATASET):
+    return read_dataset(path)
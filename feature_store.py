@@ -0,0 +1,117 @@
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+from data_store import (
+    CACHE_DIR,
+    STRESS_LEVEL_DATASET,
+    dataset_name,
+    dataset_version,
+    memoized,
+    read_dataset,
+)
+from timings import span
+
+FEATURE_DIR = os.path.join(CACHE_DIR, "features")
+TARGET = "stress_level"
+
+# one build at a time: concurrent builds of a version would share a tmp directory
+_lock = threading.Lock()
+
+
+class FeatureStore:
+    """Raw and standardized numeric matrices of a dataset, memory-mapped read-only.
+
+    Every process that opens the same dataset version maps the same files,
+    so the arrays live once in the OS page cache instead of once per session.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        self.version = meta["version"]
+        self.columns = meta["columns"]
+        self.n_samples = meta["n_samples"]
+        self.mean = np.asarray(meta["mean"])
+        self.scale = np.asarray(meta["scale"])
+        self.var = np.asarray(meta["var"])
+        self.raw = np.load(os.path.join(directory, "raw.npy"), mmap_mode="r")
+        self.scaled = np.load(os.path.join(directory, "scaled.npy"), mmap_mode="r")
+
+    def column_index(self, columns):
+        return [self.columns.index(c) for c in columns]
+
+    @property
+    def feature_columns(self):
+        return [c for c in self.columns if c != TARGET]
+
+    @property
+    def target(self):
+        return self.raw[:, self.columns.index(TARGET)]
+
+    def scaler(self, columns=None):
+        # a fitted StandardScaler rebuilt from the stored parameters, no refit
+        from sklearn.preprocessing import StandardScaler
+
+        idx = self.column_index(columns) if columns is not None else slice(None)
+        scaler = StandardScaler()
+        scaler.mean_ = self.mean[idx]
+        scaler.scale_ = self.scale[idx]
+        scaler.var_ = self.var[idx]
+        scaler.n_samples_seen_ = self.n_samples
+        scaler.n_features_in_ = len(scaler.mean_)
+        return scaler
+
+
+def _store_dir(path, version):
+    return os.path.join(FEATURE_DIR, f"{dataset_name(path)}-{version[:16]}")
+
+
+def build_feature_store(df, directory, version):
+    from sklearn.preprocessing import StandardScaler
+
+    with span("scale"):
+        numeric = df.select_dtypes(include=[np.number])
+        raw = np.ascontiguousarray(numeric.to_numpy())
+        scaler = StandardScaler().fit(raw)
+        scaled = np.ascontiguousarray(scaler.transform(raw))
+
+    # build next to the final location, then publish with one rename so that
+    # concurrent workers never map a half-written store
+    tmp = f"{directory}.{os.getpid()}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+    np.save(os.path.join(tmp, "raw.npy"), raw)
+    np.save(os.path.join(tmp, "scaled.npy"), scaled)
+    meta = {
+        "version": version,
+        "columns": numeric.columns.tolist(),
+        "n_samples": int(scaler.n_samples_seen_),
+        "mean": scaler.mean_.tolist(),
+        "scale": scaler.scale_.tolist(),
+        "var": scaler.var_.tolist(),
+    }
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    try:
+        os.rename(tmp, directory)
+    except OSError:
+        # another process published the same version first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def load_feature_store(path=STRESS_LEVEL_DATASET):
+    version = dataset_version(path)
+
+    def build():
+        directory = _store_dir(path, version)
+        with _lock:
+            if not os.path.exists(os.path.join(directory, "meta.json")):
+                os.makedirs(FEATURE_DIR, exist_ok=True)
+                build_feature_store(read_dataset(path), directory, version)
+        return FeatureStore(directory)
+
+    return memoized(("feature_store", path), version, build)
@@ -0,0 +1,93 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from timings import span
+
+# st.pyplot's savefig defaults, so cached images look the same as before
+SAVEFIG_KWARGS = {"bbox_inches": "tight", "dpi": 200}
+MAX_CACHE_BYTES = int(os.environ.get("STRESS_MONITOR_FIGURE_CACHE_MB", "64")) * 1024 * 1024
+
+
+class FigureCache:
+    """Rendered figures (PNG/SVG bytes) in least-recently-used order, bounded by total size."""
+
+    def __init__(self, max_bytes=MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cache = FigureCache()
+
+
+def render_figure(fig, fmt="png"):
+    # the figure is always closed, so pyplot's global registry cannot grow
+    import matplotlib.pyplot as plt
+
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=fmt, **SAVEFIG_KWARGS)
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+def cached_figure(key, draw, fmt="png", cache=None):
+    """Bytes of the figure returned by draw(), rendered once per key.
+
+    key should identify everything the chart depends on, e.g.
+    (dataset version, chart type, column, parameters).
+    """
+    cache = _cache if cache is None else cache
+    key = (fmt,) + tuple(key)
+    data = cache.get(key)
+    if data is None:
+        # only a miss draws: hits cost a dictionary lookup
+        import matplotlib.pyplot as plt
+
+        with span("plot"):
+            before = set(plt.get_fignums())
+            try:
+                data = render_figure(draw(), fmt)
+            finally:
+                # figures draw() opened but did not return, e.g. when it raised halfway
+                for num in set(plt.get_fignums()) - before:
+                    plt.close(num)
+        cache.put(key, data)
+    return data
@@ -0,0 +1,112 @@
+import numpy as np
+
+from data_store import dataset_version, load_stress_dataset, memoized, read_dataset
+
+
+class ColumnIndex:
+    """Row positions of one numeric column sorted by value.
+
+    A range [lo, hi] is a contiguous slice of the sorted values, found with
+    two binary searches, so counting it is O(log n) and listing it is
+    O(log n + matches). Missing values sort last and never match.
+    """
+
+    def __init__(self, values):
+        # values keep their dtype (uint8 for the survey columns) to stay small
+        self.values = np.asarray(values)
+        order = np.argsort(self.values, kind="stable")
+        self.order = order.astype(np.int32) if len(order) < 2**31 else order
+        self.sorted = self.values[self.order]
+
+    def _typed(self, lo, hi):
+        # slider values are floats; comparing them with a uint8 array would
+        # upcast the whole column, so integer columns get integer bounds
+        if np.issubdtype(self.values.dtype, np.integer):
+            info = np.iinfo(self.values.dtype)
+            lo, hi = max(np.ceil(lo), info.min), min(np.floor(hi), info.max)
+            if lo > hi:
+                return None
+        return self.values.dtype.type(lo), self.values.dtype.type(hi)
+
+    def bounds(self, lo, hi):
+        typed = self._typed(lo, hi)
+        if typed is None:
+            return 0, 0
+        start = np.searchsorted(self.sorted, typed[0], side="left")
+        stop = np.searchsorted(self.sorted, typed[1], side="right")
+        return start, max(start, stop)
+
+    def contains(self, ids, lo, hi):
+        # mask of the given rows whose value lies in [lo, hi]
+        typed = self._typed(lo, hi)
+        if typed is None:
+            return np.zeros(len(ids), dtype=bool)
+        values = self.values[ids]
+        return (values >= typed[0]) & (values <= typed[1])
+
+    def count(self, lo, hi):
+        start, stop = self.bounds(lo, hi)
+        return int(stop - start)
+
+    def row_ids(self, lo, hi):
+        start, stop = self.bounds(lo, hi)
+        return self.order[start:stop]
+
+    def covers(self, lo, hi):
+        # true when the range keeps every row
+        return self.count(lo, hi) == len(self.values)
+
+
+class FrameIndex:
+    """Sorted indexes over the numeric columns of a frame, for compound range filters.
+
+    ranges map column -> (lo, hi), both inclusive like Series.between.
+    Ranges that keep every row are dropped. The rest are ordered by match
+    count: the most selective one lists its candidate rows through its
+    index, and the others are checked only on those candidates. A query
+    therefore costs O(k log n + m) for k ranges and m rows matching the
+    narrowest one, instead of k full scans.
+    """
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        numeric = df.select_dtypes(include=[np.number])
+        self.columns = numeric.columns.tolist()
+        self.indexes = {col: ColumnIndex(numeric[col].to_numpy()) for col in self.columns}
+
+    def _plan(self, ranges):
+        active = [(col, lo, hi) for col, (lo, hi) in ranges.items() if not self.indexes[col].covers(lo, hi)]
+        return sorted(active, key=lambda r: self.indexes[r[0]].count(r[1], r[2]))
+
+    def row_ids(self, ranges):
+        # positions (for df.iloc) of rows inside every range, in frame order
+        plan = self._plan(ranges)
+        if not plan:
+            return np.arange(self.n_rows)
+        col, lo, hi = plan[0]
+        ids = np.sort(self.indexes[col].row_ids(lo, hi))
+        for col, lo, hi in plan[1:]:
+            ids = ids[self.indexes[col].contains(ids, lo, hi)]
+            if len(ids) == 0:
+                break
+        return ids
+
+    def count(self, ranges):
+        plan = self._plan(ranges)
+        if not plan:
+            return self.n_rows
+        if len(plan) == 1:
+            col, lo, hi = plan[0]
+            return self.indexes[col].count(lo, hi)
+        return len(self.row_ids(ranges))
+
+
+def load_frame_index(path, clean=False):
+    # built in memory once per dataset version; argsort of the survey columns is cheap
+    version = dataset_version(path)
+
+    def build():
+        df = load_stress_dataset(path) if clean else read_dataset(path)
+        return FrameIndex(df)
+
+    return memoized(("frame_index", path, clean), version, build)
@@ -0,0 +1,152 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from data_store import CACHE_DIR, STRESS_LEVEL_DATASET, dataset_name, memoized
+from feature_store import FeatureStore, load_feature_store
+from model_registry import registry_key
+from timings import span
+
+K_SELECTION_DIR = os.path.join(CACHE_DIR, "k_selection")
+
+K_VALUES = list(range(2, 11))
+SAMPLE_SIZE = 2000
+REFERENCE_SIZE = 2000
+Z_95 = 1.96
+
+
+# -------- SILHOUETTE ESTIMATE --------
+def _distances(Q, R):
+    # euclidean distances via ||q||^2 - 2 q.r + ||r||^2, as sklearn computes them
+    d2 = (Q ** 2).sum(axis=1)[:, None] - 2.0 * Q @ R.T + (R ** 2).sum(axis=1)
+    return np.sqrt(np.maximum(d2, 0))
+
+
+def sampled_silhouette(X, labels, sample_size=SAMPLE_SIZE, reference_size=REFERENCE_SIZE, random_state=0):
+    """Mean silhouette estimated from a random sample, with a 95% confidence interval.
+
+    Silhouettes are computed for up to sample_size query rows, each against
+    up to reference_size rows drawn from every cluster, so the cost is
+    O(sample_size * reference_size * k * d) whatever the number of rows. The
+    interval covers the query sampling (with a finite population
+    correction); when both sizes cover the data the estimate is the exact
+    silhouette_score and the interval collapses to it.
+    Returns (mean, lower, upper).
+    """
+    rng = np.random.default_rng(random_state)
+    labels = np.asarray(labels)
+    n = len(labels)
+    n_clusters = int(labels.max()) + 1
+    sizes = np.bincount(labels, minlength=n_clusters)
+
+    queries = np.sort(rng.choice(n, min(sample_size, n), replace=False))
+    Q = np.asarray(X[queries], dtype=np.float64)
+    mean_dist = np.empty((len(queries), n_clusters))
+    for c in range(n_clusters):
+        members = np.flatnonzero(labels == c)
+        if len(members) > reference_size:
+            members = np.sort(rng.choice(members, reference_size, replace=False))
+        total = _distances(Q, np.asarray(X[members], dtype=np.float64)).sum(axis=1)
+        # a query that is also a reference row adds a zero distance to itself
+        count = len(members) - np.isin(queries, members)
+        mean_dist[:, c] = total / np.maximum(count, 1)
+
+    rows = np.arange(len(queries))
+    own = labels[queries]
+    a = mean_dist[rows, own].copy()
+    mean_dist[rows, own] = np.inf
+    b = mean_dist.min(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = np.nan_to_num((b - a) / np.maximum(a, b))
+    # sklearn's convention: rows of single-member clusters score 0
+    s[sizes[own] == 1] = 0.0
+
+    mean = float(s.mean())
+    if len(s) < 2:
+        return mean, mean, mean
+    half = Z_95 * s.std(ddof=1) / np.sqrt(len(s)) * np.sqrt(1 - len(s) / n)
+    return mean, float(mean - half), float(mean + half)
+
+
+# -------- SWEEP --------
+def evaluate_k(X, k, params, sample_size=SAMPLE_SIZE, reference_size=REFERENCE_SIZE):
+    from sklearn.cluster import KMeans
+
+    kmeans = KMeans(n_clusters=k, random_state=params["random_state"], n_init=params["n_init"])
+    labels = kmeans.fit_predict(X)
+    mean, lower, upper = sampled_silhouette(
+        X, labels, sample_size, reference_size, random_state=params["random_state"]
+    )
+    return {
+        "k": k,
+        "inertia": float(kmeans.inertia_),
+        "silhouette": mean,
+        "silhouette_lower": lower,
+        "silhouette_upper": upper,
+    }
+
+
+def _evaluate_stored(directory, k, params, sample_size, reference_size):
+    # workers map the feature store themselves instead of receiving a pickled copy;
+    # the same feature columns risk groups are fitted on
+    store = FeatureStore(directory)
+    X = store.scaled[:, store.column_index(store.feature_columns)]
+    return evaluate_k(X, k, params, sample_size, reference_size)
+
+
+def sweep_k(store, params, k_values=K_VALUES, sample_size=SAMPLE_SIZE, reference_size=REFERENCE_SIZE, workers=None):
+    """Inertia and silhouette (with bounds) for every k, one KMeans fit per worker."""
+    # a silhouette needs 2 <= k <= n_samples - 1; tiny partitions may leave no k
+    k_values = [k for k in k_values if 2 <= k < store.n_samples]
+    if not k_values:
+        return []
+    workers = min(workers or os.cpu_count() or 1, len(k_values))
+    args = [(store.directory, k, params, sample_size, reference_size) for k in k_values]
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            return list(pool.map(_evaluate_stored, *zip(*args)))
+    return [_evaluate_stored(*a) for a in args]
+
+
+def choose_k(curve, default=None):
+    # the smallest k whose interval reaches the best k's lower bound: no larger
+    # k is distinguishable from it at this sample size; default for an empty sweep
+    if not curve:
+        return default
+    best = max(curve, key=lambda row: row["silhouette"])
+    return min(row["k"] for row in curve if row["silhouette_upper"] >= best["silhouette_lower"])
+
+
+# -------- CACHE --------
+def load_k_selection(params, path=STRESS_LEVEL_DATASET, k_values=K_VALUES):
+    """{"curve": [...], "best_k": k} for the dataset's feature store, cached per version.
+
+    params supplies the KMeans random_state and n_init; its n_clusters is
+    best_k only when the data is too small to evaluate any k (empty curve).
+    """
+    store = load_feature_store(path)
+    default_k = params.get("n_clusters")
+    params = {"random_state": params["random_state"], "n_init": params["n_init"]}
+    settings = {"params": params, "columns": "features", "k_values": list(k_values), "sample": SAMPLE_SIZE, "reference": REFERENCE_SIZE}
+    key = registry_key(store.version, settings)
+    cache_path = os.path.join(K_SELECTION_DIR, f"{dataset_name(path)}-{key}.json")
+
+    def build():
+        try:
+            with open(cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+        with span("fit"):
+            curve = sweep_k(store, params, k_values)
+        result = {"curve": curve, "best_k": choose_k(curve, default_k)}
+        os.makedirs(K_SELECTION_DIR, exist_ok=True)
+        tmp = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(result, f, indent=2)
+        os.replace(tmp, cache_path)
+        return result
+
+    return memoized(("k_selection", path), key, build)
@@ -0,0 +1,235 @@
+"""Cross-validated comparison of the candidate models from the ml_source notebooks.
+
+Example:
+    python model_comparison.py --dataset stress_level --folds 5 --workers 4
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from data_store import (
+    CACHE_DIR,
+    STRESS_DATASET,
+    STRESS_LEVEL_DATASET,
+    dataset_version,
+    load_stress_dataset,
+    load_stress_level_dataset,
+)
+
+RESULTS_DIR = os.path.join(CACHE_DIR, "model_comparison")
+
+# dataset name -> (source file, target column)
+DATASETS = {
+    "stress_level": (STRESS_LEVEL_DATASET, "stress_level"),
+    "stress_type": (STRESS_DATASET, "stress_type"),
+}
+
+# model name -> constructor parameters, as used in ml_source1/ml_source2
+CANDIDATES = {
+    "Logistic Regression": {"max_iter": 200},
+    "Random Forest": {"n_estimators": 200, "random_state": 42},
+    "LightGBM": {"random_state": 42, "verbose": -1},
+    "XGBoost": {"random_state": 42},
+}
+# (dataset, model) -> parameters that differ between the two notebooks:
+# ml_source2 fits its stress_type forest with 100 trees, ml_source1 with 200
+DATASET_PARAMS = {
+    ("stress_type", "Random Forest"): {"n_estimators": 100},
+}
+
+
+# model name -> the optional library that provides it
+OPTIONAL_LIBRARIES = {"LightGBM": "lightgbm", "XGBoost": "xgboost"}
+
+
+# -------- MODELS --------
+def available_models():
+    models = ["Logistic Regression", "Random Forest"]
+    for name, module in OPTIONAL_LIBRARIES.items():
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        models.append(name)
+    return models
+
+
+def make_model(name, params):
+    if name == "Logistic Regression":
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import make_pipeline
+        from sklearn.preprocessing import StandardScaler
+
+        # scaled inside the pipeline so each fold fits its own scaler
+        return make_pipeline(StandardScaler(), LogisticRegression(**params))
+    if name == "Random Forest":
+        from sklearn.ensemble import RandomForestClassifier
+
+        return RandomForestClassifier(**params)
+    if name == "LightGBM":
+        from lightgbm import LGBMClassifier
+
+        return LGBMClassifier(**params)
+    if name == "XGBoost":
+        from xgboost import XGBClassifier
+
+        return XGBClassifier(**params)
+    raise ValueError(f"unknown model: {name}")
+
+
+# -------- DATA --------
+_xy = {}
+
+
+def load_xy(dataset):
+    if dataset not in _xy:
+        path, target = DATASETS[dataset]
+        df = load_stress_dataset(path) if dataset == "stress_type" else load_stress_level_dataset(path)
+        X = df.drop(columns=[target]).to_numpy()
+        # label-encode the target (stress_type is a category of long strings)
+        _, y = np.unique(df[target].to_numpy(), return_inverse=True)
+        _xy[dataset] = (X, y)
+    return _xy[dataset]
+
+
+def library_version(model):
+    # read from the package metadata, so building a cache key imports nothing
+    from importlib.metadata import PackageNotFoundError, version
+
+    module = OPTIONAL_LIBRARIES.get(model)
+    if module is None:
+        return None
+    try:
+        return version(module)
+    except PackageNotFoundError:
+        return None
+
+
+# -------- FOLDS --------
+def fold_key(version, model, params, n_splits, seed, fold):
+    # scores are reused until the data, the setup or a library version changes
+    payload = json.dumps(
+        {
+            "data": version,
+            "model": model,
+            "params": params,
+            "n_splits": n_splits,
+            "seed": seed,
+            "fold": fold,
+            "sklearn": sklearn.__version__,
+            "library": library_version(model),
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def _result_path(key):
+    return os.path.join(RESULTS_DIR, f"{key}.json")
+
+
+def run_fold(dataset, model, params, train_idx, test_idx):
+    from sklearn.metrics import accuracy_score, f1_score
+
+    X, y = load_xy(dataset)
+    estimator = make_model(model, params)
+
+    started = time.perf_counter()
+    estimator.fit(X[train_idx], y[train_idx])
+    fit_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    pred = estimator.predict(X[test_idx])
+    predict_seconds = time.perf_counter() - started
+
+    return {
+        "accuracy": accuracy_score(y[test_idx], pred),
+        "f1_weighted": f1_score(y[test_idx], pred, average="weighted"),
+        "fit_seconds": fit_seconds,
+        "predict_ms_per_row": 1000 * predict_seconds / len(test_idx),
+    }
+
+
+def _run_and_store(key, dataset, model, params, train_idx, test_idx):
+    result = run_fold(dataset, model, params, train_idx, test_idx)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    tmp = f"{_result_path(key)}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(result, f)
+    os.replace(tmp, _result_path(key))
+    return result
+
+
+def _cached(key):
+    try:
+        with open(_result_path(key)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def compare_models(dataset="stress_level", models=None, n_splits=5, seed=42, workers=None):
+    from sklearn.model_selection import StratifiedKFold
+
+    path, _ = DATASETS[dataset]
+    version = dataset_version(path)
+    _, y = load_xy(dataset)
+    folds = list(StratifiedKFold(n_splits, shuffle=True, random_state=seed).split(np.zeros(len(y)), y))
+    models = models or available_models()
+
+    rows, jobs = [], []
+    for model in models:
+        params = {**CANDIDATES[model], **DATASET_PARAMS.get((dataset, model), {})}
+        for fold, (train_idx, test_idx) in enumerate(folds):
+            key = fold_key(version, model, params, n_splits, seed, fold)
+            cached = _cached(key)
+            if cached is not None:
+                rows.append({"model": model, "fold": fold, **cached})
+            else:
+                jobs.append((key, model, fold, params, train_idx, test_idx))
+
+    if jobs:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [
+                (model, fold, pool.submit(_run_and_store, key, dataset, model, params, tr, te))
+                for key, model, fold, params, tr, te in jobs
+            ]
+            for model, fold, future in futures:
+                rows.append({"model": model, "fold": fold, **future.result()})
+
+    per_fold = pd.DataFrame(rows)
+    summary = per_fold.groupby("model", sort=False).agg(
+        accuracy=("accuracy", "mean"),
+        accuracy_std=("accuracy", "std"),
+        f1_weighted=("f1_weighted", "mean"),
+        f1_weighted_std=("f1_weighted", "std"),
+        fit_seconds=("fit_seconds", "mean"),
+        predict_ms_per_row=("predict_ms_per_row", "mean"),
+    )
+    return summary.sort_values("f1_weighted", ascending=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dataset", choices=sorted(DATASETS), default="stress_level")
+    parser.add_argument("--models", nargs="+", choices=list(CANDIDATES), default=None)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to the CPU count")
+    args = parser.parse_args(argv)
+
+    results = compare_models(args.dataset, args.models, args.folds, args.seed, args.workers)
+    print(results.round(4).to_string())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
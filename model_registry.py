@@ -0,0 +1,274 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import version
+
+import numpy as np
+
+from data_store import CACHE_DIR, STRESS_LEVEL_DATASET, dataset_name
+from feature_store import TARGET, FeatureStore, load_feature_store
+from timings import span
+
+MODEL_DIR = os.path.join(CACHE_DIR, "models")
+# loaded artifacts kept in memory (sized by their pickles), least recently used evicted first
+MAX_MODEL_BYTES = int(os.environ.get("STRESS_MONITOR_MODEL_MB", "512")) * 1024 * 1024
+
+# read from the installed metadata: importing sklearn itself costs ~1s at page start
+SKLEARN_VERSION = version("scikit-learn")
+
+ALERT_MODEL_PARAMS = {
+    "n_estimators": 200,
+    "random_state": 42,
+    "test_size": 0.3,
+    "split_random_state": 42,
+}
+
+# out-of-fold scores for every student: same forest, 5-fold stratified CV
+OOF_PARAMS = {
+    "n_estimators": 200,
+    "random_state": 42,
+    "n_splits": 5,
+    "cv_random_state": 42,
+}
+
+_models = OrderedDict()
+_lock = threading.Lock()
+# per-model-version locks: a version is trained once, without blocking lookups of others
+_building = {}
+
+
+# -------- KEYS --------
+def registry_key(dataset_version, params):
+    # pickled estimators are only safe to reload with the sklearn that wrote them
+    payload = json.dumps(
+        {"data": dataset_version, "params": params, "sklearn": SKLEARN_VERSION},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def _model_dir(name, key):
+    return os.path.join(MODEL_DIR, name, key)
+
+
+def list_models(name):
+    # registered versions of a model, newest first
+    base = os.path.join(MODEL_DIR, name)
+    entries = []
+    for key in os.listdir(base) if os.path.isdir(base) else []:
+        try:
+            with open(os.path.join(base, key, "meta.json")) as f:
+                entries.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return sorted(entries, key=lambda m: m["created"], reverse=True)
+
+
+# -------- STORAGE --------
+def save_artifact(name, key, artifact, meta):
+    import joblib
+
+    directory = _model_dir(name, key)
+    os.makedirs(directory, exist_ok=True)
+    tmp = os.path.join(directory, f"model.joblib.{os.getpid()}.tmp")
+    joblib.dump(artifact, tmp)
+    os.replace(tmp, os.path.join(directory, "model.joblib"))
+    # meta.json is written last: its presence marks a complete entry
+    tmp = os.path.join(directory, f"meta.json.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, os.path.join(directory, "meta.json"))
+
+
+def load_artifact(name, key):
+    import joblib
+
+    directory = _model_dir(name, key)
+    if not os.path.exists(os.path.join(directory, "meta.json")):
+        return None
+    try:
+        with span("load"):
+            return joblib.load(os.path.join(directory, "model.joblib"))
+    except (OSError, EOFError, ValueError):
+        return None
+
+
+def get_or_train(name, dataset_version, params, train, dataset=None):
+    # dataset (its dataset_name) is recorded so partition cache pruning can attribute the model
+    key = registry_key(dataset_version, params)
+    with _lock:
+        cached = _models.get((name, key))
+        if cached is not None:
+            _models.move_to_end((name, key))
+            return cached[1]
+        building = _building.setdefault((name, key), threading.Lock())
+    with building:
+        with _lock:
+            cached = _models.get((name, key))
+        if cached is not None:
+            return cached[1]
+        artifact = load_artifact(name, key)
+        if artifact is None:
+            started = time.perf_counter()
+            artifact = train(params)
+            meta = {
+                "name": name,
+                "key": key,
+                "dataset": dataset,
+                "dataset_version": dataset_version,
+                "params": params,
+                "sklearn": SKLEARN_VERSION,
+                "created": time.time(),
+                "train_seconds": time.perf_counter() - started,
+                "metrics": artifact.get("metrics", {}),
+            }
+            save_artifact(name, key, artifact, meta)
+        # one entry per model and dataset (partition) version, within the memory budget
+        try:
+            size = os.path.getsize(os.path.join(_model_dir(name, key), "model.joblib"))
+        except OSError:
+            size = 0
+        with _lock:
+            _models[(name, key)] = (size, artifact)
+            while len(_models) > 1 and sum(s for s, _ in _models.values()) > MAX_MODEL_BYTES:
+                _models.popitem(last=False)
+            _building.pop((name, key), None)
+    return artifact
+
+
+# -------- ALERTS RANDOM FOREST --------
+def train_alert_model(store, params=ALERT_MODEL_PARAMS):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    feature_idx = store.column_index(store.feature_columns)
+    features = store.raw[:, feature_idx]
+    y = np.asarray(store.target)
+
+    train_idx, test_idx = train_test_split(
+        np.arange(len(y)),
+        test_size=params["test_size"],
+        random_state=params["split_random_state"],
+        stratify=y,
+    )
+
+    with span("scale"):
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(features[train_idx])
+        X_test_scaled = scaler.transform(features[test_idx])
+
+    rf = RandomForestClassifier(
+        n_estimators=params["n_estimators"],
+        random_state=params["random_state"],
+    )
+    with span("fit"):
+        rf.fit(X_train_scaled, y[train_idx])
+    with span("predict"):
+        test_pred = rf.predict(X_test_scaled)
+
+    return {
+        "feature_columns": store.feature_columns,
+        "target": TARGET,
+        "scaler": scaler,
+        "model": rf,
+        "train_idx": train_idx,
+        "test_idx": test_idx,
+        "test_pred": test_pred,
+        "metrics": {"test_accuracy": float((test_pred == y[test_idx]).mean())},
+    }
+
+
+def load_alert_model(path=STRESS_LEVEL_DATASET, params=ALERT_MODEL_PARAMS):
+    store = load_feature_store(path)
+    return get_or_train(
+        "alerts_rf",
+        store.version,
+        params,
+        lambda p: train_alert_model(store, p),
+        dataset=dataset_name(path),
+    )
+
+
+# -------- OUT-OF-FOLD SCORES --------
+def oof_splits(target, n_splits=OOF_PARAMS["n_splits"]):
+    # stratified folds need a student of every class in each fold; below 2 there is no OOF
+    _, counts = np.unique(np.asarray(target), return_counts=True)
+    return min(n_splits, int(counts.min())) if len(counts) else 0
+
+
+def _fit_fold(directory, params, train_idx, test_idx):
+    # one CV fold in a worker: scaler and forest fit on the other folds only
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+
+    store = FeatureStore(directory)
+    features = store.raw[:, store.column_index(store.feature_columns)]
+    y = np.asarray(store.target)
+
+    scaler = StandardScaler().fit(features[train_idx])
+    rf = RandomForestClassifier(
+        n_estimators=params["n_estimators"],
+        random_state=params["random_state"],
+    )
+    rf.fit(scaler.transform(features[train_idx]), y[train_idx])
+    return rf.classes_, rf.predict_proba(scaler.transform(features[test_idx]))
+
+
+def train_oof_predictions(store, params=OOF_PARAMS, workers=None):
+    """Class probabilities for every row from the fold model that did not see it.
+
+    Folds are fitted in a process pool; each worker maps the feature store
+    itself. proba columns follow classes, and pred is their argmax, i.e.
+    what the fold forest's predict() returns. Small data gets fewer folds
+    (see oof_splits); ValueError when even 2 are not possible.
+    """
+    from sklearn.model_selection import StratifiedKFold
+
+    y = np.asarray(store.target)
+    classes = np.unique(y)
+    n_splits = oof_splits(y, params["n_splits"])
+    if n_splits < 2:
+        raise ValueError("out-of-fold scores need at least 2 students at every stress level")
+    splitter = StratifiedKFold(n_splits, shuffle=True, random_state=params["cv_random_state"])
+    folds = list(splitter.split(np.zeros(len(y)), y))
+
+    workers = min(workers or os.cpu_count() or 1, len(folds))
+    args = [(store.directory, params, train_idx, test_idx) for train_idx, test_idx in folds]
+    # workers cannot report spans: each fold's scaling, fit and scoring counts as fit
+    with span("fit"):
+        if workers > 1:
+            with ProcessPoolExecutor(workers) as pool:
+                results = list(pool.map(_fit_fold, *zip(*args)))
+        else:
+            results = [_fit_fold(*a) for a in args]
+
+    proba = np.zeros((len(y), len(classes)))
+    fold_of = np.empty(len(y), dtype=np.int8)
+    for fold, ((_, test_idx), (fold_classes, fold_proba)) in enumerate(zip(folds, results)):
+        proba[np.ix_(test_idx, np.searchsorted(classes, fold_classes))] = fold_proba
+        fold_of[test_idx] = fold
+    pred = classes[proba.argmax(axis=1)]
+
+    return {
+        "classes": classes,
+        "proba": proba,
+        "pred": pred,
+        "fold": fold_of,
+        "metrics": {"oof_accuracy": float((pred == y).mean())},
+    }
+
+
+def load_oof_predictions(path=STRESS_LEVEL_DATASET, params=OOF_PARAMS):
+    store = load_feature_store(path)
+    return get_or_train(
+        "alerts_rf_oof",
+        store.version,
+        params,
+        lambda p: train_oof_predictions(store, p),
+        dataset=dataset_name(path),
+    )
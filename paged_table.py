@@ -0,0 +1,114 @@
+import math
+import re
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from timings import span
+
+INDEX_COLUMN = "(row id)"
+
+
+# -------- QUERIES --------
+def parse_id_query(text):
+    # "12, 40-45 118" -> [(12, 12), (40, 45), (118, 118)]; anything else is ignored
+    ranges = []
+    for lo, hi in re.findall(r"(\d+)(?:\s*-\s*(\d+))?", text or ""):
+        lo = int(lo)
+        hi = int(hi) if hi else lo
+        ranges.append((min(lo, hi), max(lo, hi)))
+    return ranges
+
+
+def search_ids(df, text):
+    """Positions of the rows whose index label is one of the ids or id ranges in text.
+
+    Integer ranges are resolved with binary search on a sorted index, other
+    ids by hash lookup, so the frame is never scanned row by row.
+    """
+    ranges = parse_id_query(text)
+    if not ranges:
+        return np.arange(len(df))
+    index = df.index
+    if index.is_monotonic_increasing and np.issubdtype(index.dtype, np.integer):
+        labels = index.to_numpy()
+        parts = [
+            np.arange(np.searchsorted(labels, lo, "left"), np.searchsorted(labels, hi, "right"))
+            for lo, hi in ranges
+        ]
+        return np.unique(np.concatenate(parts))
+    wanted = [i for lo, hi in ranges for i in range(lo, min(hi, lo + 10_000) + 1)]
+    positions = index.get_indexer(wanted)
+    return np.unique(positions[positions >= 0])
+
+
+def sorted_page(df, positions, sort_by, ascending, page, page_size):
+    """The rows of one page, sorted on sort_by (INDEX_COLUMN keeps frame order).
+
+    Only the rows up to the end of the requested page are ordered: a partial
+    partition selects them and just those are sorted, so paging through the
+    first screens of a long list costs O(n + k log k) rather than a full sort.
+    """
+    start = page * page_size
+    stop = min(start + page_size, len(positions))
+    if start >= stop:
+        return df.iloc[:0]
+    if sort_by == INDEX_COLUMN:
+        order = positions if ascending else positions[::-1]
+        return df.iloc[order[start:stop]]
+
+    keys = df[sort_by].to_numpy()[positions]
+    if keys.dtype.kind not in "biuf":
+        # labels and categories sort by their sorted codes
+        keys = pd.factorize(df[sort_by], sort=True)[0][positions]
+    if not ascending:
+        keys = -keys.astype(np.float64)
+    head = np.arange(len(keys))
+    if stop < len(keys):
+        # rows strictly before the stop-th key, then ties in position order,
+        # so consecutive pages neither overlap nor skip tied rows
+        kth = np.partition(keys, stop - 1)[stop - 1]
+        if kth != kth:  # NaN sorts last
+            before, tied = keys == keys, keys != keys
+        else:
+            before, tied = keys < kth, keys == kth
+        tied = np.flatnonzero(tied)[: stop - np.count_nonzero(before)]
+        head = np.concatenate([np.flatnonzero(before), tied])
+    head = head[np.lexsort((head, keys[head]))]
+    return df.iloc[positions[head[start:stop]]]
+
+
+# -------- COMPONENT --------
+def paged_dataframe(df, key, page_size=20, **dataframe_kwargs):
+    """st.dataframe over one page of df with server-side sort, paging and id search.
+
+    Only the visible page is serialized to the browser.
+    """
+    col_search, col_sort, col_order, col_page = st.columns([2, 2, 1, 1])
+    with col_search:
+        query = st.text_input(
+            "Find students", key=f"{key}_search", placeholder="e.g. 12, 40-45"
+        )
+    with col_sort:
+        sort_by = st.selectbox("Sort by", [INDEX_COLUMN] + df.columns.tolist(), key=f"{key}_sort")
+    with col_order:
+        order = st.selectbox("Order", ["Ascending", "Descending"], key=f"{key}_order")
+
+    positions = search_ids(df, query)
+    n_pages = max(1, math.ceil(len(positions) / page_size))
+    # a shorter list (new threshold or search) must not leave the page out of range
+    if st.session_state.get(f"{key}_page", 1) > n_pages:
+        st.session_state[f"{key}_page"] = n_pages
+    with col_page:
+        page = st.number_input("Page", min_value=1, max_value=n_pages, step=1, key=f"{key}_page")
+
+    rows = sorted_page(df, positions, sort_by, order == "Ascending", page - 1, page_size)
+    with span("dataframe"):
+        st.dataframe(rows, **dataframe_kwargs)
+    first = (page - 1) * page_size
+    st.caption(
+        f"Rows {min(first + 1, len(positions))}–{first + len(rows)} of {len(positions)}"
+        + (f" matching “{query}”" if query.strip() else "")
+    )
+    return rows
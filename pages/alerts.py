@@ -1,12 +1,32 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestClassifier
+from alert_scores import load_score_index
+from artifacts import enable_background_refresh
+from data_store import (
+    STRESS_DATASET,
+    STRESS_LEVEL_DATASET,
+    dataset_version,
+    load_stress_dataset,
+    load_stress_level_dataset,
+    pin_versions,
+)
+from figure_cache import cached_figure
+from model_registry import OOF_PARAMS, load_oof_predictions, oof_splits, registry_key
+from paged_table import paged_dataframe
+from partitions import select_partition
+from timings import end_page, span, start_page
 
 st.set_page_config(page_title="Alerts", page_icon="🚨", layout="wide")
+# every stage below is timed under this page (see timings.py)
+start_page("alerts")
+
+# a changed data file is reprocessed in the background while the last version keeps serving
+enable_background_refresh()
+# institution and survey wave to show; the flat CSVs when there is no partitioned data
+stress_path, stress_level_path = select_partition(STRESS_DATASET, STRESS_LEVEL_DATASET)
+# one version of each file for this whole run, even if a refresh publishes meanwhile
+pin_versions(stress_path, stress_level_path)
 
 # -------- SIDEBAR --------
 with st.sidebar:
@@ -25,7 +45,7 @@ with st.sidebar:
         st.markdown(
             """
             - **⚖️ Rule‑based alerts** → uses recorded `stress_level` (0–2).  
-            - **🤖 ML‑based alerts** → uses model‑predicted stress levels.  
+            - **🤖 ML‑based alerts** → uses the model's probability of high stress.  
             - **⭐ Prioritization** → students flagged by **both** methods.
             """
         )
@@ -64,44 +84,33 @@ st.markdown(
 
 st.divider()
 
-@st.cache_data
-def load_data():
-    df1 = pd.read_csv("Stress_Dataset.csv")
-    df1.rename(
-        columns={"Which type of stress do you primarily experience?": "stress_type"},
-        inplace=True,
-    )
-    df1 = df1[(df1["Age"] >= 18) & (df1["Age"] <= 21)]
+df1 = load_stress_dataset(stress_path)
+df2 = load_stress_level_dataset(stress_level_path)
 
-    df2 = pd.read_csv("StressLevelDataset.csv")
-    return df1, df2
+# --------- MODEL PREP  ----------
+if oof_splits(df2["stress_level"], OOF_PARAMS["n_splits"]) < 2:
+    st.warning(
+        f"Only {len(df2)} students in this data: ML alerts need at least 2 students "
+        "at every stress level."
+    )
+    st.stop()
 
-df1, df2 = load_data()
+# out-of-fold predictions for every student, computed once per dataset version
+# and hyperparameters (folds in parallel), then loaded from the model registry
+oof = load_oof_predictions(stress_level_path)
+# students sorted by probability of high stress: threshold and top-N queries
+# are binary searches, precision/recall precomputed for every cut
+score_index = load_score_index(stress_level_path)
+scores_version = registry_key(dataset_version(stress_level_path), OOF_PARAMS)
 
-# --------- MODEL PREP  ----------
 X = df2.drop(columns=["stress_level"])
 y = df2["stress_level"]
 
-X_train, X_test, y_train, y_test = train_test_split(
-    X,
-    y,
-    test_size=0.3,
-    random_state=42,
-    stratify=y,
-)
-
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
-
-rf = RandomForestClassifier(n_estimators=200, random_state=42)
-rf.fit(X_train_scaled, y_train)
-
-y_pred_test = rf.predict(X_test_scaled)
-
-df_test = X_test.copy()
-df_test["true_stress_level"] = y_test
-df_test["ml_pred"] = y_pred_test
+# every student has a prediction, so flags are boolean masks over the same rows
+stress_levels = y.to_numpy()
+ml_pred = oof["pred"]
+ml_score = oof["proba"][:, -1]
+df_scored = X.assign(true_stress_level=y, ml_pred=ml_pred, ml_score=ml_score)
 
 # -------- TABS --------
 tab_rule, tab_ml, tab_prior = st.tabs(
@@ -135,8 +144,8 @@ with tab_rule:
             key="rule_threshold",
         )
 
-    df2["alert_flag"] = df2["stress_level"] >= rule_threshold
-    rule_alerts = df2[df2["alert_flag"]].copy()
+    rule_flag = stress_levels >= rule_threshold
+    rule_alerts = df2[rule_flag]
 
     col_rule_metric, col_rule_info = st.columns([1, 2])
 
@@ -150,11 +159,7 @@ with tab_rule:
     with col_rule_info:
         st.empty()  
 
-    st.dataframe(
-        rule_alerts.head(20),
-        use_container_width=True,
-        height=260,
-    )
+    paged_dataframe(rule_alerts, key="rule_table", use_container_width=True, height=260)
 
     st.markdown("### 🔍 Inspect individual students (rule‑based)")
 
@@ -184,11 +189,12 @@ with tab_rule:
         st.markdown("&nbsp;")  
 
         st.markdown("**Full feature profile**")
-        st.dataframe(
-            pd.DataFrame(student_rule).rename(columns={selected_idx_rule: "value"}),
-            width=450,
-            height=260,
-        )
+        with span("dataframe"):
+            st.dataframe(
+                pd.DataFrame(student_rule).rename(columns={selected_idx_rule: "value"}),
+                width=450,
+                height=260,
+            )
 
     else:
         st.caption("No students currently meet the rule‑based alert threshold.")
@@ -203,20 +209,21 @@ with tab_ml:
         st.subheader("Machine Learning‑Based Alerts")
         st.markdown(
             """
-            This view uses a **Random Forest** model trained on the dataset to predict `stress_level`  
-            for a held‑out test set (30% of the data). Students with high **predicted** stress  
-            are highlighted as potential risk cases.
+            This view uses a **Random Forest** model to predict `stress_level` for **every** student,  
+            each one scored by a model trained without them (cross‑validation). Students with a high  
+            **predicted probability** of stress level 2 are highlighted as potential risk cases.
             """
         )
 
-        accuracy = (df_test["ml_pred"] == df_test["true_stress_level"]).mean()
+        accuracy = oof["metrics"]["oof_accuracy"]
+        n_splits = oof_splits(y, OOF_PARAMS["n_splits"])
         st.markdown(
             f"""
             <div style="background-color:#ecfdf5; border-radius:10px; padding:0.6rem 0.8rem;
                         border:1px solid #bbf7d0; font-size:0.9rem; color:#166534; margin-top:0.6rem;">
                 <b>Model performance</b><br>
-                ✅ Random Forest accuracy on the test set: <b>{accuracy:.2%}</b>.<br>
-                📊 Trained on <b>70%</b> of the data, evaluated on <b>30%</b>.
+                ✅ Random Forest out‑of‑fold accuracy: <b>{accuracy:.2%}</b>.<br>
+                📊 <b>{n_splits}</b>‑fold cross‑validation: each prediction comes from the <b>{n_splits - 1}/{n_splits}</b> of the data that excludes the student.
             </div>
             """,
             unsafe_allow_html=True,
@@ -226,35 +233,92 @@ with tab_ml:
 
     with col_ml_controls:
         st.markdown("#### Model settings")
-        ml_threshold = st.slider(
-            "Minimum predicted stress level (ML)",
-            min_value=0,
-            max_value=2,
-            value=2,
-            step=1,
-            help="Students with predicted stress_level ≥ this value will be included in the ML alert list.",
-            key="ml_threshold",
+        ml_mode = st.radio(
+            "Flag students by",
+            ["Probability threshold", "Top N most at risk"],
+            horizontal=True,
+            key="ml_mode",
         )
-
-    ml_alerts = df_test[df_test["ml_pred"] >= ml_threshold].copy()
-
-    col_ml_metric, col_ml_info = st.columns([1, 2])
+        if ml_mode == "Probability threshold":
+            ml_threshold = st.slider(
+                "Minimum probability of high stress (ML)",
+                min_value=0.0,
+                max_value=1.0,
+                value=0.5,
+                step=0.01,
+                help="Students whose predicted probability of stress_level 2 is at least this value are included in the ML alert list.",
+                key="ml_threshold",
+            )
+            ml_rows = score_index.flagged(ml_threshold)
+        else:
+            ml_top_n = st.number_input(
+                "Number of students to flag",
+                min_value=1,
+                max_value=score_index.n,
+                value=min(50, score_index.n),
+                step=10,
+                help="The students with the highest predicted probability of stress_level 2. Students tied with the last one are flagged too.",
+                key="ml_top_n",
+            )
+            ml_rows, ml_threshold = score_index.top(ml_top_n)
+            if len(ml_rows) > ml_top_n:
+                st.caption(
+                    f"{len(ml_rows)} students flagged: {len(ml_rows) - ml_top_n} more share the "
+                    f"cut-off probability of {ml_threshold:.2f}."
+                )
+
+    ml_flag = score_index.mask(ml_rows)
+    ml_alerts = df_scored[ml_flag]
+    ml_precision, ml_recall = score_index.precision_recall(len(ml_rows))
+
+    col_ml_metric, col_precision, col_recall = st.columns(3)
 
     with col_ml_metric:
         st.metric(
             "Students needing attention (ML)",
             value=len(ml_alerts),
-            help="Number of students in the test set whose predicted stress_level exceeds the selected threshold.",
+            help="Number of students flagged from their out-of-fold probability of high stress.",
         )
 
-    with col_ml_info:
-        st.empty()
+    with col_precision:
+        st.metric(
+            "Precision",
+            value=f"{ml_precision:.0%}" if len(ml_rows) else "–",
+            help="Share of flagged students whose recorded stress_level is 2.",
+        )
 
-    st.dataframe(
-        ml_alerts.head(20),
-        use_container_width=True,
-        height=260,
-    )
+    with col_recall:
+        st.metric(
+            "Recall",
+            value=f"{ml_recall:.0%}",
+            help="Share of students with recorded stress_level 2 who are flagged.",
+        )
+
+    with st.expander("📈 Precision, recall and alert count for every threshold", expanded=False):
+
+        def draw_threshold_curves():
+            import matplotlib.pyplot as plt
+
+            curves = score_index.curves()
+            fig_curves, ax_rate = plt.subplots(figsize=(8, 3.5))
+            ax_rate.step(curves["threshold"], curves["precision"], where="post", color="#1d4ed8", label="Precision")
+            ax_rate.step(curves["threshold"], curves["recall"], where="post", color="#16a34a", label="Recall")
+            ax_rate.set_xlabel("Minimum probability of high stress")
+            ax_rate.set_ylabel("Rate")
+            ax_rate.set_ylim(0, 1.05)
+            ax_rate.grid(linestyle="--", alpha=0.3)
+            ax_count = ax_rate.twinx()
+            ax_count.step(curves["threshold"], curves["flagged"], where="post", color="#b91c1c", linestyle=":", label="Students flagged")
+            ax_count.set_ylabel("Students flagged")
+            handles = ax_rate.get_legend_handles_labels()
+            extra = ax_count.get_legend_handles_labels()
+            ax_rate.legend(handles[0] + extra[0], handles[1] + extra[1], loc="lower left", fontsize=8)
+            return fig_curves
+
+        st.image(cached_figure((scores_version, "threshold_curves"), draw_threshold_curves), use_container_width=True)
+        st.caption(f"Current cut: probability ≥ {ml_threshold:.2f}.")
+
+    paged_dataframe(ml_alerts, key="ml_table", use_container_width=True, height=260)
 
     st.markdown("### 🔍 Inspect individual students (ML alerts)")
 
@@ -277,6 +341,8 @@ with tab_ml:
                     <b>True stress level:</b> {int(student_ml["true_stress_level"])}
                     &nbsp;|&nbsp;
                     <b>Predicted:</b> {int(student_ml["ml_pred"])}
+                    &nbsp;|&nbsp;
+                    <b>P(high stress):</b> {student_ml["ml_score"]:.2f}
                 </p>
             </div>
             """,
@@ -286,14 +352,15 @@ with tab_ml:
         st.markdown("&nbsp;")  
 
         st.markdown("**Full feature profile**")
-        feature_cols_ml = [c for c in ml_alerts.columns if c not in ["true_stress_level", "ml_pred"]]
-        st.dataframe(
-            pd.DataFrame(student_ml[feature_cols_ml]).rename(
-                columns={selected_idx_ml: "value"}
-            ),
-            width=450,
-            height=260,
-        )
+        feature_cols_ml = [c for c in ml_alerts.columns if c not in ["true_stress_level", "ml_pred", "ml_score"]]
+        with span("dataframe"):
+            st.dataframe(
+                pd.DataFrame(student_ml[feature_cols_ml]).rename(
+                    columns={selected_idx_ml: "value"}
+                ),
+                width=450,
+                height=260,
+            )
 
     else:
         st.caption("No students currently meet the ML alert threshold.")
@@ -327,13 +394,7 @@ with tab_prior:
 
     st.markdown("&nbsp;")  
 
-    df2["alert_flag"] = df2["stress_level"] >= rule_threshold
-    rule_alerts = df2[df2["alert_flag"]].copy()
-
-    common_index = set(rule_alerts.index).intersection(set(df_test.index))
-    overlap = df_test.loc[list(common_index)].copy()
-    overlap = overlap[overlap["ml_pred"] >= ml_threshold]
-    overlap = overlap[overlap["true_stress_level"] >= rule_threshold]
+    overlap = df_scored[rule_flag & ml_flag]
 
     col_prior_metric, col_prior_text = st.columns([1, 2])
 
@@ -348,11 +409,7 @@ with tab_prior:
         st.empty()
 
     if not overlap.empty:
-        st.dataframe(
-            overlap.head(20),
-            use_container_width=True,
-            height=260,
-        )
+        paged_dataframe(overlap, key="overlap_table", use_container_width=True, height=260)
 
         st.markdown("### 🔍 Inspect highest‑priority students")
 
@@ -383,16 +440,19 @@ with tab_prior:
         st.markdown("&nbsp;")  
 
         st.markdown("**Full feature profile**")
-        feature_cols_overlap = [c for c in overlap.columns if c not in ["true_stress_level", "ml_pred"]]
-        st.dataframe(
-            pd.DataFrame(overlap_row[feature_cols_overlap]).rename(
-                columns={selected_idx_overlap: "value"}
-            ),
-            width=450,
-            height=260,
-        )
+        feature_cols_overlap = [c for c in overlap.columns if c not in ["true_stress_level", "ml_pred", "ml_score"]]
+        with span("dataframe"):
+            st.dataframe(
+                pd.DataFrame(overlap_row[feature_cols_overlap]).rename(
+                    columns={selected_idx_overlap: "value"}
+                ),
+                width=450,
+                height=260,
+            )
 
     else:
         st.caption(
             "Currently, no students are simultaneously flagged by the selected rule‑based and ML thresholds."
         )
+
+end_page()
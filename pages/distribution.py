@@ -1,10 +1,34 @@
 import streamlit as st
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
-import seaborn as sns
+
+from aggregates import STRESS_DIMENSIONS, load_stress_cube, measures_of, rollup
+from artifacts import enable_background_refresh
+from correlations import load_comoments, top_columns
+from data_store import (
+    STRESS_DATASET,
+    STRESS_LEVEL_DATASET,
+    dataset_version,
+    load_stress_dataset,
+    load_stress_level_dataset,
+    pin_versions,
+)
+from figure_cache import cached_figure
+from filter_index import load_frame_index
+from histograms import load_histograms, plot_histogram
+from partitions import select_partition
+from summaries import load_summary
+from timings import end_page, span, start_page
 
 st.set_page_config(page_title="Exploratory Data Analysis", layout="wide")
+# every stage below is timed under this page (see timings.py)
+start_page("distribution")
+
+# a changed data file is reprocessed in the background while the last version keeps serving
+enable_background_refresh()
+# institution and survey wave to show; the flat CSVs when there is no partitioned data
+stress_path, stress_level_path = select_partition(STRESS_DATASET, STRESS_LEVEL_DATASET)
+# one version of each file for this whole run, even if a refresh publishes meanwhile
+pin_versions(stress_path, stress_level_path)
 
 st.markdown("""
 <style>
@@ -67,16 +91,20 @@ st.sidebar.markdown("""
     4. Use filters to interactively subset the data.  
     """)
 
-@st.cache_data
-def load_data():
-    df1 = pd.read_csv("Stress_Dataset.csv")
-    df2 = pd.read_csv("StressLevelDataset.csv")
-    return df1, df2
-
-
-df1, df2 = load_data()
-df1.rename(columns={"Which type of stress do you primarily experience?":"stress_type"}, inplace=True)
-df1 = df1[(df1["Age"]>=18) & (df1["Age"]<=21)]
+df1 = load_stress_dataset(stress_path)
+df2 = load_stress_level_dataset(stress_level_path)
+# charts are cached as rendered images keyed by these versions
+version1 = dataset_version(stress_path)
+version2 = dataset_version(stress_level_path)
+summary1 = load_summary(stress_path, clean=True)
+summary2 = load_summary(stress_level_path)
+cube1 = load_stress_cube(stress_path)
+# bin counts and KDE curves per column, precomputed once per dataset version
+histograms1 = load_histograms(stress_path, clean=True)
+histograms2 = load_histograms(stress_level_path)
+# per-column sorted indexes for the numeric range filters
+frame_index1 = load_frame_index(stress_path, clean=True)
+frame_index2 = load_frame_index(stress_level_path)
 
 tab1, tab2 = st.tabs(["📊 Stress_Dataset.csv", "📊 StressLevelDataset.csv"])
 
@@ -87,9 +115,9 @@ with tab1:
 
     st.markdown("### Dataset summary")
     colsA,colsB,colsC=st.columns(3)
-    colsA.metric("Rows",df1.shape[0])
-    colsB.metric("Columns",df1.shape[1])
-    colsC.metric("Missing values", df1.isna().sum().sum())
+    colsA.metric("Rows",summary1.shape[0])
+    colsB.metric("Columns",summary1.shape[1])
+    colsC.metric("Missing values", summary1.total_missing)
 
     st.divider()
 
@@ -111,10 +139,15 @@ with tab1:
         col_hist1 = st.selectbox("Select numerical column", numerical_cols1, key="hist_tab1")
     
     with col2:
-        fig_hist1, ax_hist1 = plt.subplots(figsize=(6, 4)) 
-        sns.histplot(df1[col_hist1], kde=True, ax=ax_hist1, color="#4f83cc")
-        ax_hist1.tick_params(labelsize=8)
-        st.pyplot(fig_hist1, use_container_width=True)
+        def draw_hist1():
+            import matplotlib.pyplot as plt
+
+            fig_hist1, ax_hist1 = plt.subplots(figsize=(6, 4))
+            plot_histogram(ax_hist1, histograms1[col_hist1], col_hist1, color="#4f83cc")
+            ax_hist1.tick_params(labelsize=8)
+            return fig_hist1
+
+        st.image(cached_figure((version1, "histogram", col_hist1), draw_hist1), use_container_width=True)
  
     st.divider()
     # Box plot
@@ -133,11 +166,17 @@ with tab1:
     with col1:
         col_box1 = st.selectbox("Select numerical column", numerical_cols1, key="box_tab1")
     with col2:
-        fig_box1, ax_box1 = plt.subplots(figsize=(6, 4))
-        sns.boxplot(y=df1[col_box1], ax=ax_box1, color="#fb8072")
-        ax_box1.set_ylabel(col_box1, fontsize=8)
-        ax_box1.tick_params(axis="both", labelsize=7)  
-        st.pyplot(fig_box1, use_container_width=True)
+        def draw_box1():
+            import matplotlib.pyplot as plt
+            import seaborn as sns
+
+            fig_box1, ax_box1 = plt.subplots(figsize=(6, 4))
+            sns.boxplot(y=df1[col_box1], ax=ax_box1, color="#fb8072")
+            ax_box1.set_ylabel(col_box1, fontsize=8)
+            ax_box1.tick_params(axis="both", labelsize=7)
+            return fig_box1
+
+        st.image(cached_figure((version1, "boxplot", col_box1), draw_box1), use_container_width=True)
         
     st.divider()
 
@@ -155,26 +194,30 @@ with tab1:
 """, unsafe_allow_html=True)
 
 
-    # compute correlations and keep top 10 features by variance (or any criterion)
-    corr1 = df1[numerical_cols1].corr()
+    # correlations come from cached co-moments; keep the 10 highest-variance items
+    comoments1 = load_comoments(stress_path, clean=True)
+    top_cols1 = top_columns(comoments1, k=10)
+    corr_small1 = comoments1.corr().loc[top_cols1, top_cols1]
 
-    # optional: take only first/top 10 columns & rows
-    top_cols1 = corr1.columns[:10]
-    corr_small1 = corr1.loc[top_cols1, top_cols1]
+    def draw_corr1():
+        import matplotlib.pyplot as plt
+        import seaborn as sns
 
-    fig_corr1, ax_corr1 = plt.subplots(figsize=(4, 3))
-    sns.heatmap(
-        corr_small1,
-        annot=False,          # <- no numbers to avoid clutter
-        cmap="coolwarm",
-        center=0,
-        ax=ax_corr1,
-        cbar_kws={"shrink": 0.6, "pad": 0.02},
-    )
+        fig_corr1, ax_corr1 = plt.subplots(figsize=(4, 3))
+        sns.heatmap(
+            corr_small1,
+            annot=False,          # <- no numbers to avoid clutter
+            cmap="coolwarm",
+            center=0,
+            ax=ax_corr1,
+            cbar_kws={"shrink": 0.6, "pad": 0.02},
+        )
+
+        ax_corr1.tick_params(axis="x", labelrotation=90, labelsize=6)
+        ax_corr1.tick_params(axis="y", labelsize=6)
+        return fig_corr1
 
-    ax_corr1.tick_params(axis="x", labelrotation=90, labelsize=6)
-    ax_corr1.tick_params(axis="y", labelsize=6)
-    st.pyplot(fig_corr1)
+    st.image(cached_figure((version1, "correlation", tuple(top_cols1)), draw_corr1), use_container_width=True)
 
     st.markdown("""
 <div class="info-box">
@@ -188,20 +231,48 @@ with tab1:
 
     st.divider()
 
+    # Breakdown by demographics and category (from the pre-aggregated cube)
+    st.markdown('<div class="section-title">👥 Breakdown by age, gender and stress type</div>', unsafe_allow_html=True)
+    st.markdown("""
+<div class="info-box">
+    <div class="info-title">How to read this breakdown</div>
+    • Each row is a group of students (for example one age or one stress type).<br>
+    • <b>count</b> is the number of students in the group.<br>
+    • <b>mean</b> and <b>std</b> summarize the selected variable within the group.
+</div>
+""", unsafe_allow_html=True)
+
+    col1,col2=st.columns([1,2])
+    with col1:
+        breakdown_dim1 = st.selectbox("Group by", STRESS_DIMENSIONS, key="breakdown_dim_tab1")
+        breakdown_col1 = st.selectbox("Select numerical column", measures_of(cube1), key="breakdown_col_tab1")
+    with col2:
+        breakdown1 = rollup(cube1, [breakdown_dim1], breakdown_col1)
+        with span("dataframe"):
+            st.dataframe(breakdown1, use_container_width=True)
+
+    st.divider()
+
     # Filtering tool (numeric)
     st.markdown('<div class="section-title">🔍 Filter data (numeric)</div>', unsafe_allow_html=True)
-    selected_col1 = st.selectbox("Select variable", numerical_cols1, key="filter_tab1")
-    min_val1, max_val1 = float(df1[selected_col1].min()), float(df1[selected_col1].max())
-    filter_range1 = st.slider(
-        f"Range for {selected_col1}",
-        min_val1,
-        max_val1,
-        (min_val1, max_val1),
-        key="slider_tab1",
+    selected_cols1 = st.multiselect(
+        "Select variables", numerical_cols1, default=numerical_cols1[:1], key="filter_tab1"
     )
-    filtered_df1 = df1[df1[selected_col1].between(filter_range1[0], filter_range1[1])]
-    st.metric("Filtered records", len(filtered_df1))
-    st.dataframe(filtered_df1.head(), use_container_width=True)
+    filter_ranges1 = {}
+    for col in selected_cols1:
+        min_val1, max_val1 = float(summary1.mins[col]), float(summary1.maxs[col])
+        filter_ranges1[col] = st.slider(
+            f"Range for {col}",
+            min_val1,
+            max_val1,
+            (min_val1, max_val1),
+            key=f"slider_tab1_{col}",
+        )
+    # every range is resolved through the sorted column indexes, narrowest first
+    filtered_ids1 = frame_index1.row_ids(filter_ranges1)
+    st.metric("Filtered records", len(filtered_ids1))
+    with span("dataframe"):
+        st.dataframe(df1.iloc[filtered_ids1[:5]], use_container_width=True)
 
 # ---------- TAB 2 ----------
 with tab2:
@@ -211,9 +282,9 @@ with tab2:
 
     st.markdown("### Dataset summary")
     colsA,colsB,colsC=st.columns(3)
-    colsA.metric("Rows",df2.shape[0])
-    colsB.metric("Columns",df2.shape[1])
-    colsC.metric("Missing values", df2.isna().sum().sum())
+    colsA.metric("Rows",summary2.shape[0])
+    colsB.metric("Columns",summary2.shape[1])
+    colsC.metric("Missing values", summary2.total_missing)
 
     st.divider()
 
@@ -232,10 +303,15 @@ with tab2:
     with col1:
         col_hist2 = st.selectbox("Select numerical column", numerical_cols2, key="hist_tab2")
     with col2:
-        fig_hist2, ax_hist2 = plt.subplots(figsize=(6, 4))
-        sns.histplot(df2[col_hist2], kde=True, ax=ax_hist2, color="#4f83cc")
-        ax_hist2.tick_params(labelsize=8)
-        st.pyplot(fig_hist2, use_container_width=False)
+        def draw_hist2():
+            import matplotlib.pyplot as plt
+
+            fig_hist2, ax_hist2 = plt.subplots(figsize=(6, 4))
+            plot_histogram(ax_hist2, histograms2[col_hist2], col_hist2, color="#4f83cc")
+            ax_hist2.tick_params(labelsize=8)
+            return fig_hist2
+
+        st.image(cached_figure((version2, "histogram", col_hist2), draw_hist2))
 
     st.divider()
     # Box plot
@@ -254,10 +330,16 @@ with tab2:
     with col1:
         col_box2 = st.selectbox("Select numerical column", numerical_cols2, key="box_tab2")
     with col2:
-        fig_box2, ax_box2 = plt.subplots(figsize=(6, 4))
-        sns.boxplot(y=df2[col_box2], ax=ax_box2, color="#fb8072")
-        ax_box2.tick_params(labelsize=8)
-        st.pyplot(fig_box2, use_container_width=False)
+        def draw_box2():
+            import matplotlib.pyplot as plt
+            import seaborn as sns
+
+            fig_box2, ax_box2 = plt.subplots(figsize=(6, 4))
+            sns.boxplot(y=df2[col_box2], ax=ax_box2, color="#fb8072")
+            ax_box2.tick_params(labelsize=8)
+            return fig_box2
+
+        st.image(cached_figure((version2, "boxplot", col_box2), draw_box2))
 
     st.divider()
     # Correlation heatmap
@@ -273,23 +355,30 @@ with tab2:
 </div>
 """, unsafe_allow_html=True)
 
-    corr2 = df2[numerical_cols2].corr()
-    top_cols2 = corr2.columns[:10]
-    corr_small2 = corr2.loc[top_cols2, top_cols2]
-
-    fig_corr2, ax_corr2 = plt.subplots(figsize=(4, 3))
-    sns.heatmap(
-        corr_small2,
-        annot=False,
-        cmap="coolwarm",
-        center=0,
-        ax=ax_corr2,
-        cbar_kws={"shrink": 0.6, "pad": 0.02},
-    )
+    # stress_level plus the 9 features most correlated with it (|r|)
+    comoments2 = load_comoments(stress_level_path)
+    top_cols2 = top_columns(comoments2, k=10, target="stress_level")
+    corr_small2 = comoments2.corr().loc[top_cols2, top_cols2]
+
+    def draw_corr2():
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        fig_corr2, ax_corr2 = plt.subplots(figsize=(4, 3))
+        sns.heatmap(
+            corr_small2,
+            annot=False,
+            cmap="coolwarm",
+            center=0,
+            ax=ax_corr2,
+            cbar_kws={"shrink": 0.6, "pad": 0.02},
+        )
+
+        ax_corr2.tick_params(axis="x", labelrotation=90, labelsize=6)
+        ax_corr2.tick_params(axis="y", labelsize=6)
+        return fig_corr2
 
-    ax_corr2.tick_params(axis="x", labelrotation=90, labelsize=6)
-    ax_corr2.tick_params(axis="y", labelsize=6)
-    st.pyplot(fig_corr2, use_container_width=False)
+    st.image(cached_figure((version2, "correlation", tuple(top_cols2)), draw_corr2))
 
     st.markdown("""
 <div class="info-box">
@@ -305,15 +394,23 @@ with tab2:
     st.divider()
     # Filtering tool (numeric)
     st.markdown('<div class="section-title">🔍 Filter data (numeric)</div>', unsafe_allow_html=True)
-    selected_col2 = st.selectbox("Select variable", numerical_cols2, key="filter_tab2")
-    min_val2, max_val2 = float(df2[selected_col2].min()), float(df2[selected_col2].max())
-    filter_range2 = st.slider(
-        f"Range for {selected_col2}",
-        min_val2,
-        max_val2,
-        (min_val2, max_val2),
-        key="slider_tab2",
+    selected_cols2 = st.multiselect(
+        "Select variables", numerical_cols2, default=numerical_cols2[:1], key="filter_tab2"
     )
-    filtered_df2 = df2[df2[selected_col2].between(filter_range2[0], filter_range2[1])]
-    st.metric("Filtered records", len(filtered_df2))
-    st.dataframe(filtered_df2.head(), use_container_width=True)
+    filter_ranges2 = {}
+    for col in selected_cols2:
+        min_val2, max_val2 = float(summary2.mins[col]), float(summary2.maxs[col])
+        filter_ranges2[col] = st.slider(
+            f"Range for {col}",
+            min_val2,
+            max_val2,
+            (min_val2, max_val2),
+            key=f"slider_tab2_{col}",
+        )
+    # every range is resolved through the sorted column indexes, narrowest first
+    filtered_ids2 = frame_index2.row_ids(filter_ranges2)
+    st.metric("Filtered records", len(filtered_ids2))
+    with span("dataframe"):
+        st.dataframe(df2.iloc[filtered_ids2[:5]], use_container_width=True)
+
+end_page()
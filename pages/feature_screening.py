@@ -0,0 +1,126 @@
+import streamlit as st
+
+from artifacts import enable_background_refresh
+from chi_square import load_chi_square
+from data_store import STRESS_DATASET, dataset_version, pin_versions
+from figure_cache import cached_figure
+from partitions import select_partition
+from timings import end_page, span, start_page
+
+st.set_page_config(page_title="Feature Screening", page_icon="🧪", layout="wide")
+# every stage below is timed under this page (see timings.py)
+start_page("feature_screening")
+
+# a changed data file is reprocessed in the background while the last version keeps serving
+enable_background_refresh()
+# institution and survey wave to show; the flat CSVs when there is no partitioned data
+(stress_path,) = select_partition(STRESS_DATASET)
+# one version of each file for this whole run, even if a refresh publishes meanwhile
+pin_versions(stress_path)
+
+# ---- HEADER ----
+st.markdown(
+    """
+    <h1 style='text-align:center; color:#7c3aed;'>🧪 Feature Screening</h1>
+    <p style='text-align:center; font-size:1.05rem; color:#4b5563;'>
+        Find the survey questions most associated with each student's primary stress type.
+    </p>
+    <p style='text-align:center; font-size:0.95rem; color:#6b7280;'>
+        Data source: <b>Stress_Dataset.csv</b>
+    </p>
+    """,
+    unsafe_allow_html=True,
+)
+
+st.divider()
+
+# chi-square test of every question against stress_type, computed once per dataset version
+screening = load_chi_square(stress_path)
+version = dataset_version(stress_path)
+
+# ---- SIDEBAR ----
+with st.sidebar:
+    st.markdown("### 🧪 Feature screening")
+
+    with st.expander("🧭 How to use this page", expanded=True):
+        st.markdown(
+            """
+            1. Pick a **significance level**.
+            2. Check how many questions are **significantly associated** with stress type.
+            3. Use the ranking to decide which questions matter most.
+            """
+        )
+
+    with st.expander("📊 Data notes", expanded=False):
+        st.markdown(
+            """
+            - Each question is crossed with **stress type** and tested with a **chi‑square test**.
+            - **Cramér's V** (0–1) measures the strength of the association.
+            - Students outside **18–21 years old** are excluded, as on the other pages.
+            """
+        )
+
+# ---- METRICS ----
+st.subheader("Step 1 · Choose a significance level")
+
+alpha = st.select_slider(
+    "Significance level (α)",
+    options=[0.001, 0.01, 0.05, 0.1],
+    value=0.05,
+    key="alpha",
+)
+significant = screening[screening["p_value"] < alpha]
+
+col1, col2, col3 = st.columns(3)
+col1.metric("Questions screened", len(screening))
+col2.metric("Significant at α", len(significant))
+col3.metric(
+    "Strongest association (Cramér's V)",
+    f"{screening['cramers_v'].max():.2f}" if len(screening) else "–",
+)
+
+st.markdown("---")
+
+# ---- RANKING CHART ----
+st.subheader("Step 2 · Strength of association")
+
+n_screened = len(screening)
+# a slider needs two distinct bounds: small partitions may screen only one question
+if n_screened > 1:
+    top_n = st.slider("Questions to show", 1, n_screened, min(15, n_screened), key="top_n")
+else:
+    top_n = n_screened
+top = screening.nlargest(top_n, "cramers_v").iloc[::-1]
+
+
+def draw_ranking():
+    import matplotlib.pyplot as plt
+
+    fig_rank, ax_rank = plt.subplots(figsize=(8, 0.35 * len(top) + 1))
+    colors = ["#7c3aed" if p < alpha else "#d1d5db" for p in top["p_value"]]
+    ax_rank.barh(top["feature"], top["cramers_v"], color=colors)
+    ax_rank.set_xlabel("Cramér's V")
+    ax_rank.tick_params(axis="y", labelsize=8)
+    ax_rank.grid(axis="x", linestyle="--", alpha=0.3)
+    return fig_rank
+
+
+if top_n:
+    st.image(cached_figure((version, "chi_square", top_n, alpha), draw_ranking), use_container_width=True)
+    st.caption("Purple bars are significant at the chosen α; grey bars are not.")
+else:
+    st.info("No questions could be screened in this data.")
+
+st.markdown("---")
+
+# ---- TABLE ----
+st.subheader("Step 3 · Full results")
+
+with span("dataframe"):
+    st.dataframe(
+        screening.style.format({"chi2": "{:.2f}", "p_value": "{:.2e}", "cramers_v": "{:.3f}"}),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+end_page()
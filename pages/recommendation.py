@@ -1,7 +1,21 @@
 import streamlit as st
-import pandas as pd
+
+from aggregates import load_stress_cube, rollup
+from artifacts import enable_background_refresh
+from data_store import STRESS_DATASET, pin_versions
+from partitions import select_partition
+from timings import end_page, start_page
 
 st.set_page_config(page_title="Recommendations", page_icon="💡", layout="wide")
+# every stage below is timed under this page (see timings.py)
+start_page("recommendation")
+
+# a changed data file is reprocessed in the background while the last version keeps serving
+enable_background_refresh()
+# institution and survey wave to show; the flat CSVs when there is no partitioned data
+(stress_path,) = select_partition(STRESS_DATASET)
+# one version of each file for this whole run, even if a refresh publishes meanwhile
+pin_versions(stress_path)
 
 # ---- HEADER ----
 st.markdown(
@@ -16,17 +30,7 @@ st.markdown(
 
 st.divider()
 
-@st.cache_data
-def load_data():
-    df = pd.read_csv("Stress_Dataset.csv")
-    df.rename(
-        columns={"Which type of stress do you primarily experience?": "stress_type"},
-        inplace=True,
-    )
-    df = df[(df["Age"] >= 18) & (df["Age"] <= 21)]
-    return df
-
-df = load_data()
+stress_cube = load_stress_cube(stress_path)
 
 # ---- RECOMMENDATION DATA ----
 recommendations_dict = {
@@ -120,7 +124,7 @@ with st.sidebar:
 
     with st.expander("📊 Filter & data context", expanded=False):
         st.markdown("**Stress types present in the dataset:**")
-        type_counts = df["stress_type"].value_counts()
+        type_counts = rollup(stress_cube, ["stress_type"])["count"].sort_values(ascending=False)
         for s, c in type_counts.items():
             st.write(f"- {s}: **{c}** students")
         st.markdown("Start with the most frequent stress types if you are designing global interventions.")
@@ -267,4 +271,6 @@ if selected_types:
             unsafe_allow_html=True,
 )
 else:
-    st.caption("Select at least one stress type above to see and choose actions.")
\ No newline at end of file
+    st.caption("Select at least one stress type above to see and choose actions.")
+
+end_page()
@@ -1,19 +1,35 @@
 import streamlit as st
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-import seaborn as sns
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
+
+from aggregates import load_stress_level_cube, rollup
+from artifacts import enable_background_refresh
+from clustering import RISK_GROUP_PARAMS, load_online_risk_groups, load_risk_groups, risk_labels
+from data_store import STRESS_LEVEL_DATASET, dataset_version, load_stress_level_dataset, pin_versions
+from figure_cache import cached_figure
+from k_selection import load_k_selection
+from model_registry import registry_key
+from paged_table import paged_dataframe
+from partitions import select_partition
+from timings import end_page, span, start_page
 
 st.set_page_config(page_title="Risk Groups", page_icon="🔥", layout="wide")
+# every stage below is timed under this page (see timings.py)
+start_page("risk_groups")
+
+# a changed data file is reprocessed in the background while the last version keeps serving
+enable_background_refresh()
+# institution and survey wave to show; the flat CSVs when there is no partitioned data
+(stress_level_path,) = select_partition(STRESS_LEVEL_DATASET)
+# one version of each file for this whole run, even if a refresh publishes meanwhile
+pin_versions(stress_level_path)
 
 # ---- HEADER ----
 st.markdown(
     """
     <h1 style='text-align:center; color:#b91c1c;'>🔥 Student Risk Groups</h1>
     <p style='text-align:center; font-size:1.05rem; color:#4b5563;'>
-        Identify patterns and segment students into low, medium, and high risk groups.
+        Identify patterns and segment students into risk groups, ordered from low to high risk.
     </p>
     <p style='text-align:center; font-size:0.95rem; color:#6b7280;'>
         Data source: <b>StressLevelDataset.csv</b>
@@ -24,42 +40,31 @@ st.markdown(
 
 st.divider()
 
-@st.cache_data
-def load_data():
-    df = pd.read_csv("StressLevelDataset.csv")
-    # ensure stress_level is integer (0,1,2)
-    df["stress_level"] = df["stress_level"].astype(int)
-    return df
-
-df = load_data()
+# shared snapshot: derive new frames with assign() instead of mutating it
+df = load_stress_level_dataset(stress_level_path)
 
-# ---- CLUSTERING ----
-numcols = df.select_dtypes(include=np.number).columns
-scaler = StandardScaler()
-scaled = scaler.fit_transform(df[numcols])
-
-kmeans = KMeans(n_clusters=3, random_state=42, n_init="auto")
-df["cluster"] = kmeans.fit_predict(scaled)
-
-cluster_mean = df.groupby("cluster")["stress_level"].mean().sort_values()
-risk_mapping = {
-    cluster_mean.index[0]: "Low risk",
-    cluster_mean.index[1]: "Medium risk",
-    cluster_mean.index[2]: "High risk",
-}
-df["risk_group"] = df["cluster"].map(risk_mapping)
-
-palette = {"Low risk": "#22c55e", "Medium risk": "#fb923c", "High risk": "#ef4444"}
-level_palette = {0: "#e5e7eb", 1: "#60a5fa", 2: "#f97316"}  # for stacked bars
+# inertia and sampled silhouette for k = 2..10, swept in parallel once per dataset version
+k_selection = load_k_selection(RISK_GROUP_PARAMS, stress_level_path)
+if not k_selection["curve"]:
+    st.warning(f"Only {len(df)} students in this data: at least 3 are needed to form risk groups.")
+    st.stop()
 
 # ---- SIDEBAR ----
 with st.sidebar:
     st.markdown("### 🔥 Risk groups")
 
+    n_groups = st.select_slider(
+        "Number of risk groups",
+        options=[row["k"] for row in k_selection["curve"]],
+        value=k_selection["best_k"],
+        key="n_groups",
+        help="Defaults to the number of clusters recommended by the silhouette sweep (Step 1).",
+    )
+
     with st.expander("🧭 How to use this page", expanded=True):
         st.markdown(
             """
-            1. Review the **overall counts** of low, medium, and high‑risk students.  
+            1. Review the **overall counts** of each risk group, from low to high risk.  
             2. Check how each group is composed in terms of **stress levels 0/1/2**.  
             3. Select a risk group to **inspect example students** and details.
             """
@@ -67,20 +72,52 @@ with st.sidebar:
 
     with st.expander("📊 Data notes", expanded=False):
         st.markdown(
-            """
-            - Clusters are computed with **K‑Means (k=3)** on all numeric features.  
-            - Risk groups are labeled by **average stress_level** (higher = higher risk).  
+            f"""
+            - Clusters are computed with **K‑Means (k={n_groups})** on the survey features; **stress_level** only ranks the groups.  
+            - The number of groups is chosen from the data: it defaults to the **k recommended by the silhouette sweep** (k = {k_selection["best_k"]}, see Step 1).  
+            - Risk groups are ordered by **average stress_level**: **Low risk** first, **High risk** last, numbered **Medium risk** groups in between.  
             - Stress levels are coded as <b>0 = low</b>, <b>1 = moderate</b>, <b>2 = high</b>.
             """
         )
 
+# ---- CLUSTERING ----
+# scaler, K-Means fit, risk mapping and row assignments are computed once per
+# dataset version and k, and read back from the model registry on reruns
+risk_params = {**RISK_GROUP_PARAMS, "n_clusters": n_groups}
+risk_groups = load_risk_groups(stress_level_path, risk_params)
+group_labels = risk_labels(n_groups)
+# charts are cached as rendered images keyed by the clustering version
+groups_version = registry_key(dataset_version(stress_level_path), risk_params)
+df = df.assign(cluster=risk_groups["labels"], risk_group=risk_groups["risk_group"])
+
+# counts per group and stress level come from the stress_level x cluster cube
+level_cube = load_stress_level_cube(stress_level_path, risk_params)
+level_cube = level_cube.assign(risk_group=level_cube["cluster"].map(risk_groups["risk_mapping"]))
+group_counts = rollup(level_cube, ["risk_group"])["count"]
+
+if n_groups == 3:
+    palette = {"Low risk": "#22c55e", "Medium risk": "#fb923c", "High risk": "#ef4444"}
+else:
+    # green to red, spread over however many groups there are
+    ramp = ["#22c55e", "#84cc16", "#eab308", "#fb923c", "#f97316", "#ef4444", "#dc2626", "#b91c1c", "#7f1d1d"]
+    palette = {
+        label: ramp[int(round(i * (len(ramp) - 1) / max(n_groups - 1, 1)))]
+        for i, label in enumerate(group_labels)
+    }
+level_palette = {0: "#e5e7eb", 1: "#60a5fa", 2: "#f97316"}  # for stacked bars
+
+
+def metric_label(group, prefix=""):
+    # "Low risk" -> "Low‑risk students"; with prefix "New " -> "New low‑risk students"
+    name = group.replace(" risk", "‑risk")
+    return f"{prefix}{name[0].lower() + name[1:] if prefix else name} students"
+
+
 # ---- TOP METRICS ----
 st.subheader("Step 1 · Overview of risk groups")
 
-col1, col2, col3 = st.columns(3)
-col1.metric("Low‑risk students", int((df["risk_group"] == "Low risk").sum()))
-col2.metric("Medium‑risk students", int((df["risk_group"] == "Medium risk").sum()))
-col3.metric("High‑risk students", int((df["risk_group"] == "High risk").sum()))
+for col, group in zip(st.columns(n_groups), group_labels):
+    col.metric(metric_label(group), int(group_counts.get(group, 0)))
 
 st.markdown(
     """
@@ -96,49 +133,91 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
+with st.expander("📉 How the number of groups was chosen", expanded=False):
+    curve = pd.DataFrame(k_selection["curve"])
+
+    def draw_k_selection():
+        import matplotlib.pyplot as plt
+
+        fig_k, ax_sil = plt.subplots(figsize=(7, 3.5))
+        ax_sil.errorbar(
+            curve["k"],
+            curve["silhouette"],
+            yerr=[curve["silhouette"] - curve["silhouette_lower"], curve["silhouette_upper"] - curve["silhouette"]],
+            marker="o",
+            color="#2563eb",
+            capsize=3,
+            label="Silhouette (95% interval)",
+        )
+        ax_sil.axvline(k_selection["best_k"], color="#16a34a", linestyle="--", label="Recommended k")
+        ax_sil.set_xlabel("Number of clusters (k)")
+        ax_sil.set_ylabel("Silhouette")
+        ax_inertia = ax_sil.twinx()
+        ax_inertia.plot(curve["k"], curve["inertia"], marker="s", color="#9ca3af", label="Inertia")
+        ax_inertia.set_ylabel("Inertia")
+        handles = ax_sil.get_legend_handles_labels()
+        extra = ax_inertia.get_legend_handles_labels()
+        ax_sil.legend(handles[0] + extra[0], handles[1] + extra[1], fontsize=8)
+        ax_sil.grid(axis="y", linestyle="--", alpha=0.3)
+        return fig_k
+
+    st.image(
+        cached_figure((dataset_version(stress_level_path), "k_selection", k_selection["best_k"]), draw_k_selection),
+        use_container_width=True,
+    )
+    st.markdown(
+        f"""
+        - K‑Means is fitted for every k from {curve["k"].min()} to {curve["k"].max()}.
+        - The silhouette is estimated from a sample of students, with a 95% interval.
+        - **k = {k_selection["best_k"]}** is the smallest k whose silhouette cannot be told apart from the best one.
+        """
+    )
+
 st.markdown("&nbsp;")
 
 # ---- STACKED BAR: COMPOSITION BY STRESS LEVEL ----
 st.subheader("Step 2 · Stress level composition within each risk group")
 
 # compute proportions of stress_level 0/1/2 per risk group
-comp = (
-    df.groupby(["risk_group", "stress_level"])
-    .size()
-    .reset_index(name="count")
-)
+comp = rollup(level_cube, ["risk_group", "stress_level"]).reset_index()
 total_per_group = comp.groupby("risk_group")["count"].transform("sum")
 comp["pct"] = comp["count"] / total_per_group
 
 # pivot to wide for stacked bars
 pivot = comp.pivot(index="risk_group", columns="stress_level", values="pct").fillna(0)
-pivot = pivot.reindex(["Low risk", "Medium risk", "High risk"])
+pivot = pivot.reindex(group_labels)
 
-fig_comp, ax_comp = plt.subplots(figsize=(7, 4))
 
-bottom = np.zeros(len(pivot))
-levels_sorted = sorted(pivot.columns)  # 0,1,2
+def draw_composition():
+    import matplotlib.pyplot as plt
 
-for lvl in levels_sorted:
-    values = pivot[lvl].values
-    ax_comp.bar(
-        pivot.index,
-        values,
-        bottom=bottom,
-        label=f"Stress level {lvl}",
-        color=level_palette[lvl],
-    )
-    bottom += values
+    fig_comp, ax_comp = plt.subplots(figsize=(7, 4))
 
-ax_comp.set_ylabel("Proportion of students")
-ax_comp.set_xlabel("")
-ax_comp.set_title("Stress level composition per risk group")
-ax_comp.set_ylim(0, 1)
-ax_comp.yaxis.set_major_formatter(plt.FuncFormatter(lambda y, _: f"{int(y*100)}%"))
-ax_comp.grid(axis="y", linestyle="--", alpha=0.3)
-ax_comp.legend(title="Stress level")
+    bottom = np.zeros(len(pivot))
+    levels_sorted = sorted(pivot.columns)  # 0,1,2
 
-st.pyplot(fig_comp)
+    for lvl in levels_sorted:
+        values = pivot[lvl].values
+        ax_comp.bar(
+            pivot.index,
+            values,
+            bottom=bottom,
+            label=f"Stress level {lvl}",
+            color=level_palette[lvl],
+        )
+        bottom += values
+
+    ax_comp.set_ylabel("Proportion of students")
+    ax_comp.set_xlabel("")
+    ax_comp.set_title("Stress level composition per risk group")
+    ax_comp.set_ylim(0, 1)
+    ax_comp.yaxis.set_major_formatter(plt.FuncFormatter(lambda y, _: f"{int(y*100)}%"))
+    ax_comp.grid(axis="y", linestyle="--", alpha=0.3)
+    ax_comp.legend(title="Stress level")
+    return fig_comp
+
+
+st.image(cached_figure((groups_version, "composition"), draw_composition), use_container_width=True)
 
 st.markdown(
     """
@@ -175,21 +254,18 @@ st.subheader("Step 3 · Inspect a specific risk group")
 
 selected_group = st.selectbox(
     "Select a risk group to inspect:",
-    options=["Low risk", "Medium risk", "High risk"],
+    options=group_labels,
 )
 
 group_df = df[df["risk_group"] == selected_group].copy()
 
 st.markdown(
-    f"Showing a sample of students classified as **{selected_group}** "
+    f"Browse the students classified as **{selected_group}** "
     f"(total: **{len(group_df)}**)."
 )
 
-# show all columns for that group (head)
-st.dataframe(
-    group_df.head(20),
-    use_container_width=True,
-)
+# all columns for that group, one page at a time
+paged_dataframe(group_df, key="group_table", use_container_width=True)
 
 st.markdown(
     """
@@ -207,24 +283,29 @@ st.markdown(
 st.markdown("&nbsp;")
 
 with st.expander("📈 Stress distribution in this group", expanded=False):
-    fig_strip, ax_strip = plt.subplots(figsize=(5, 3))
-
-    sns.stripplot(
-        data=group_df,
-        x="risk_group",
-        y="stress_level",
-        jitter=0.15,
-        size=6,
-        color=palette[selected_group],
-        ax=ax_strip,
-    )
+    def draw_strip():
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        fig_strip, ax_strip = plt.subplots(figsize=(5, 3))
+
+        sns.stripplot(
+            data=group_df,
+            x="risk_group",
+            y="stress_level",
+            jitter=0.15,
+            size=6,
+            color=palette[selected_group],
+            ax=ax_strip,
+        )
 
-    ax_strip.set_xlabel("")
-    ax_strip.set_ylabel("Stress level")
-    ax_strip.set_title(f"Stress level distribution in {selected_group}")
-    ax_strip.grid(axis="y", linestyle="--", alpha=0.3)
+        ax_strip.set_xlabel("")
+        ax_strip.set_ylabel("Stress level")
+        ax_strip.set_title(f"Stress level distribution in {selected_group}")
+        ax_strip.grid(axis="y", linestyle="--", alpha=0.3)
+        return fig_strip
 
-    st.pyplot(fig_strip)
+    st.image(cached_figure((groups_version, "strip", selected_group), draw_strip), use_container_width=True)
 
     st.markdown(
         """
@@ -239,3 +320,29 @@ with st.expander("📈 Stress distribution in this group", expanded=False):
         """,
         unsafe_allow_html=True,
     )
+
+st.markdown("---")
+
+# ---- NEW RESPONSES ----
+st.subheader("Step 4 · Place new survey responses")
+
+uploaded = st.file_uploader(
+    "Upload new StressLevelDataset-style responses (CSV, stress_level not needed)",
+    type="csv",
+    help="Each row is assigned to the nearest existing group; the groups themselves are not refit.",
+)
+
+if uploaded is not None:
+    new_responses = pd.read_csv(uploaded)
+    try:
+        placed = load_online_risk_groups(stress_level_path, risk_params).assign(new_responses, learn=False)
+    except ValueError as e:
+        st.error(str(e))
+    else:
+        new_counts = placed["risk_group"].value_counts().reindex(group_labels, fill_value=0)
+        for col, group in zip(st.columns(n_groups), group_labels):
+            col.metric(metric_label(group, prefix="New "), int(new_counts[group]))
+        with span("dataframe"):
+            st.dataframe(placed.head(20), use_container_width=True)
+
+end_page()
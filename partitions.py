@@ -0,0 +1,281 @@
+"""Partitioned survey data: one Parquet file per dataset, institution and survey wave.
+
+Layout (hive-style, so other tools can read it as one partitioned dataset):
+    data/<dataset>/institution=<id>/wave=<id>/<dataset>.parquet
+
+Every partition file is an ordinary dataset path for data_store, so pages
+load only the selected slice and each slice gets its own versioned caches.
+Without a data directory the app keeps using the flat CSVs.
+
+Examples:
+    python partitions.py import Stress_Dataset.csv --institution uni-a --wave 2024-spring
+    python partitions.py import responses.csv --dataset StressLevelDataset
+    python partitions.py list
+    python partitions.py prune --max-mb 500 --keep uni-a/2024-spring
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+
+import pandas as pd
+
+from data_store import (
+    CACHE_DIR,
+    SCHEMAS,
+    STRESS_DATASET,
+    STRESS_LEVEL_DATASET,
+    apply_schema,
+    dataset_name,
+    resident_paths,
+)
+
+DATA_DIR = os.environ.get("STRESS_MONITOR_DATA", "data")
+PARTITION_COLUMNS = ("institution", "wave")
+# derived artifacts on disk (models, clusters, aggregates...) across all partitions
+MAX_CACHE_BYTES = int(os.environ.get("STRESS_MONITOR_CACHE_MB", "2048")) * 1024 * 1024
+
+_VALUE = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+# -------- LAYOUT --------
+def partition_path(dataset, institution, wave, root=None):
+    # dataset is the flat file name or its stem: "Stress_Dataset.csv" or "Stress_Dataset"
+    name = dataset_name(dataset)
+    return os.path.join(
+        root or DATA_DIR, name, f"institution={institution}", f"wave={wave}", f"{name}.parquet"
+    )
+
+
+def list_partitions(datasets=(STRESS_DATASET, STRESS_LEVEL_DATASET), root=None):
+    """(institution, wave) pairs that have a file for every one of datasets, sorted.
+
+    Only directory names are read, so this stays cheap however much data
+    each partition holds.
+    """
+    found = None
+    for dataset in datasets:
+        base = os.path.join(root or DATA_DIR, dataset_name(dataset))
+        pairs = set()
+        for inst in os.scandir(base) if os.path.isdir(base) else []:
+            if not (inst.is_dir() and inst.name.startswith("institution=")):
+                continue
+            for wave in os.scandir(inst.path):
+                if wave.is_dir() and wave.name.startswith("wave="):
+                    pair = (inst.name.split("=", 1)[1], wave.name.split("=", 1)[1])
+                    if os.path.exists(partition_path(dataset, *pair, root=root)):
+                        pairs.add(pair)
+        found = pairs if found is None else found & pairs
+    return sorted(found or ())
+
+
+# -------- IMPORT --------
+def _check_value(kind, value):
+    value = str(value)
+    if not _VALUE.match(value):
+        raise ValueError(f"invalid {kind} {value!r}: use letters, digits, '.', '_' or '-'")
+    return value
+
+
+def write_partition(df, dataset, institution, wave, root=None):
+    # compact dtypes once at import; data_store reads the file back as its snapshot
+    name = dataset_name(dataset)
+    path = partition_path(name, _check_value("institution", institution), _check_value("wave", wave), root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    apply_schema(df.reset_index(drop=True), SCHEMAS.get(name, {})).to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    return path
+
+
+def import_file(path, dataset=None, institution=None, wave=None, root=None):
+    """Split a CSV or Parquet file into partition files; returns the paths written.
+
+    Rows are partitioned by their own institution/wave columns when present,
+    otherwise the whole file goes to the given institution and wave. A
+    partition that already exists is replaced.
+    """
+    dataset = dataset or dataset_name(path)
+    df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    fixed = {"institution": institution, "wave": wave}
+    missing = [c for c in PARTITION_COLUMNS if c not in df.columns and fixed[c] is None]
+    if missing:
+        raise ValueError(f"{path} has no {' or '.join(missing)} column: pass it explicitly")
+    for col, value in fixed.items():
+        if value is not None:
+            df = df.assign(**{col: value})
+    if df[list(PARTITION_COLUMNS)].isna().any().any():
+        raise ValueError(f"{path} has rows without an institution or wave")
+
+    written = []
+    for (inst, wave_), part in df.groupby(list(PARTITION_COLUMNS), sort=True):
+        written.append(write_partition(part.drop(columns=list(PARTITION_COLUMNS)), dataset, inst, wave_, root))
+    return written
+
+
+# -------- CACHE EVICTION --------
+def partition_names(datasets=(STRESS_DATASET, STRESS_LEVEL_DATASET), root=None):
+    # dataset_name() of every partition file on disk: the prefix of its cached artifacts
+    return {
+        dataset_name(partition_path(dataset, *pair, root=root))
+        for dataset in datasets
+        for pair in list_partitions((dataset,), root)
+    }
+
+
+def _owner(path, names):
+    # the partition an entry was built from, or None for shared artifacts
+    base = os.path.basename(path)
+    # longest first: "x.uni-a.2024-1-b" must not be taken for "x.uni-a.2024-1"
+    for name in sorted(names, key=len, reverse=True):
+        if base.startswith(name) and base[len(name):len(name) + 1] in ("-", "."):
+            return name
+    try:
+        # registered models are named by key; their meta records the dataset
+        with open(os.path.join(path, "meta.json")) as f:
+            dataset = json.load(f).get("dataset")
+    except (OSError, ValueError, AttributeError):
+        return None
+    return dataset if dataset in names else None
+
+
+def _cache_entries(directory):
+    # an entry is a file, or a directory holding meta.json (a model or feature store)
+    for item in os.scandir(directory):
+        if item.is_dir():
+            if os.path.exists(os.path.join(item.path, "meta.json")):
+                files = [os.path.join(item.path, f) for f in os.listdir(item.path)]
+                yield item.path, files
+            else:
+                yield from _cache_entries(item.path)
+        elif not item.name.endswith(".tmp"):
+            yield item.path, [item.path]
+
+
+def prune_cache(max_bytes=MAX_CACHE_BYTES, cache_dir=CACHE_DIR, keep=(), root=None):
+    """Delete least recently used artifacts of idle partitions until the cache fits max_bytes.
+
+    Only entries built from a partition are candidates, and never those
+    of the partitions in keep (dataset names) or of any dataset this
+    process is serving: their feature stores are mapped by memoized
+    objects and reopened by worker processes. Shared artifacts (flat-file
+    snapshots and models, metrics) are never deleted, so the cache can
+    stay above max_bytes. Recency is the latest access or modification
+    time of an entry's files. Returns the bytes freed.
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+    names = partition_names(root=root)
+    protected = set(keep) | {dataset_name(path) for path in resident_paths()}
+    entries, total = [], 0
+    for path, files in _cache_entries(cache_dir):
+        stats = [os.stat(f) for f in files if os.path.isfile(f)]
+        if not stats:
+            continue
+        size = sum(s.st_size for s in stats)
+        total += size
+        owner = _owner(path, names)
+        if owner is not None and owner not in protected:
+            entries.append((max(max(s.st_atime, s.st_mtime) for s in stats), size, path))
+    freed = 0
+    for _, size, path in sorted(entries):
+        if total - freed <= max_bytes:
+            break
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+        freed += size
+    return freed
+
+
+# -------- STREAMLIT --------
+def select_partition(*datasets, root=None):
+    """Sidebar pickers for institution and survey wave; returns one path per dataset.
+
+    The choice is kept in session state so it follows the user across
+    pages. With no partitioned data for these datasets the flat files are
+    returned unchanged and nothing is drawn.
+    """
+    import streamlit as st
+
+    partitions = list_partitions(datasets, root)
+    if not partitions:
+        return list(datasets)
+
+    current = st.session_state.get("partition")
+    if current not in partitions:
+        current = partitions[-1]
+    institutions = sorted({inst for inst, _ in partitions})
+    with st.sidebar:
+        st.markdown("### 🏫 Data partition")
+        institution = st.selectbox(
+            "Institution", institutions, index=institutions.index(current[0]), key="institution"
+        )
+        waves = [w for inst, w in partitions if inst == institution]
+        wave = st.selectbox(
+            "Survey wave",
+            waves,
+            index=waves.index(current[1]) if current[1] in waves else len(waves) - 1,
+            key="wave",
+        )
+
+    paths = [partition_path(dataset, institution, wave, root) for dataset in datasets]
+    if (institution, wave) != st.session_state.get("partition"):
+        st.session_state["partition"] = (institution, wave)
+        # switching slices is when new per-partition artifacts get written
+        prune_cache(keep={dataset_name(path) for path in paths}, root=root)
+    return paths
+
+
+# -------- CLI --------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    imp = commands.add_parser("import", help="split a CSV or Parquet file into partitions")
+    imp.add_argument("input")
+    imp.add_argument("--dataset", default=None, help="dataset name (default: the input's file name)")
+    imp.add_argument("--institution", default=None, help="for files without an institution column")
+    imp.add_argument("--wave", default=None, help="for files without a wave column")
+
+    commands.add_parser("list", help="show the partitions holding both datasets")
+
+    prune = commands.add_parser("prune", help="evict least recently used artifacts of idle partitions")
+    prune.add_argument("--max-mb", type=float, default=MAX_CACHE_BYTES / 1024 / 1024)
+    prune.add_argument(
+        "--keep",
+        action="append",
+        default=[],
+        metavar="INSTITUTION/WAVE",
+        help="a partition a running app is serving; repeat for several",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        try:
+            written = import_file(args.input, args.dataset, args.institution, args.wave)
+        except ValueError as e:
+            parser.error(str(e))
+        for path in written:
+            print(path)
+    elif args.command == "list":
+        for institution, wave in list_partitions():
+            print(f"{institution}\t{wave}")
+    else:
+        keep = set()
+        for value in args.keep:
+            institution, _, wave = value.partition("/")
+            keep |= {dataset_name(partition_path(d, institution, wave)) for d in (STRESS_DATASET, STRESS_LEVEL_DATASET)}
+        freed = prune_cache(int(args.max_mb * 1024 * 1024), keep=keep)
+        print(f"freed {freed / 1024 / 1024:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""The hidden Performance view: where each page's reruns spend their time.
+
+Shown instead of the home page when the app is opened with ?performance
+in the URL, so it is not listed in the sidebar. It reads the spans
+recorded by timings in this server process.
+"""
+import pandas as pd
+import streamlit as st
+
+from timings import METRICS_PATH, STAGES, prometheus_text, reset, snapshot, write_metrics
+
+
+def stage_table():
+    """One row per (page, stage): span count, total seconds and p50/p95/p99 in ms."""
+    rows = [
+        {
+            "page": page,
+            "stage": stage,
+            "spans": count,
+            "total_s": total,
+            "p50_ms": p50 * 1000,
+            "p95_ms": p95 * 1000,
+            "p99_ms": p99 * 1000,
+        }
+        for (page, stage), (count, total, p50, p95, p99) in snapshot().items()
+    ]
+    columns = ["page", "stage", "spans", "total_s", "p50_ms", "p95_ms", "p99_ms"]
+    table = pd.DataFrame(rows, columns=columns)
+    # pipeline order: load before preprocess before fit..., the whole rerun last
+    order = {stage: i for i, stage in enumerate(STAGES)}
+    table["_order"] = table["stage"].map(order).fillna(len(STAGES))
+    return table.sort_values(["page", "_order", "stage"]).drop(columns="_order").reset_index(drop=True)
+
+
+def show_performance():
+    st.markdown(
+        """
+        <h1 style='text-align:center; color:#0f766e;'>⏱️ Performance</h1>
+        <p style='text-align:center; font-size:1.05rem; color:#4b5563;'>
+            Time spent in each stage of every page's reruns, since this server started.
+        </p>
+        """,
+        unsafe_allow_html=True,
+    )
+
+    table = stage_table()
+    if table.empty:
+        st.info("No spans recorded yet: open the other pages first.")
+        return
+
+    pages = sorted(table["page"].unique())
+    page = st.selectbox("Page", pages, index=pages.index("home") if "home" in pages else 0, key="perf_page")
+    selected = table[table["page"] == page]
+
+    rerun = selected[selected["stage"] == "rerun"]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Reruns", int(rerun["spans"].sum()) if len(rerun) else 0)
+    for col, q in zip((col2, col3, col4), ("p50", "p95", "p99")):
+        col.metric(f"Rerun {q}", f"{rerun[f'{q}_ms'].iloc[0]:.0f} ms" if len(rerun) else "–")
+
+    stages = selected[selected["stage"] != "rerun"].set_index("stage")
+    if len(stages):
+        st.bar_chart(stages[["p50_ms", "p95_ms", "p99_ms"]], horizontal=True, stack=False)
+    st.caption(
+        "Percentiles are over each stage's last spans. A stage's time includes the stages "
+        "nested in it (e.g. a model fit that first loads its data); 'background' is "
+        "work done by refresh threads."
+    )
+
+    st.dataframe(
+        table.style.format(
+            {"total_s": "{:.2f}", "p50_ms": "{:.1f}", "p95_ms": "{:.1f}", "p99_ms": "{:.1f}"}
+        ),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+    col_export, col_reset = st.columns(2)
+    with col_export:
+        if st.button("Export metrics file now", key="perf_export"):
+            st.success(f"Written to {write_metrics()}")
+        else:
+            st.caption(f"Exported to {METRICS_PATH} every few seconds while pages run.")
+    with col_reset:
+        if st.button("Reset timings", key="perf_reset"):
+            reset()
+            st.rerun()
+
+    with st.expander("Prometheus text", expanded=False):
+        st.code(prometheus_text(), language="text")
@@ -0,0 +1,158 @@
+"""Score a file of students with the alerts Random Forest, without Streamlit.
+
+Example:
+    python score_alerts.py students.csv --output-dir alerts/ --workers 4
+
+Writes rule_alerts.csv, ml_alerts.csv and prioritization.csv (flagged by both).
+"""
+import argparse
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from compiled_forest import SMALL_BATCH_ROWS, load_compiled_alert_model
+from data_store import STRESS_LEVEL_DATASET
+from model_registry import load_alert_model
+
+OUTPUTS = {
+    "rule": "rule_alerts.csv",
+    "ml": "ml_alerts.csv",
+    "both": "prioritization.csv",
+}
+
+_model = None
+_forest = None
+
+
+# -------- INPUT --------
+def iter_chunks(path, chunksize):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        offset = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            chunk = batch.to_pandas()
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            yield chunk
+    else:
+        # read_csv keeps a running index across chunks: it doubles as the student id
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+# -------- WORKERS --------
+def _init_worker(dataset):
+    global _model, _forest
+    _model = load_alert_model(dataset)
+    _forest = load_compiled_alert_model(dataset)
+
+
+def predict_chunk(features, model, forest=None):
+    # small chunks go through the compiled forest's flat node arrays, which
+    # skip sklearn's per-call overhead; both give identical predictions
+    if forest is not None and len(features) <= SMALL_BATCH_ROWS:
+        return forest.predict(features)
+    return model["model"].predict(model["scaler"].transform(features))
+
+
+def score_chunk(chunk, rule_threshold, ml_threshold, model=None, forest=None):
+    if model is None:
+        model, forest = _model, forest or _forest
+    features = chunk[model["feature_columns"]].to_numpy()
+    scored = chunk.assign(ml_pred=predict_chunk(features, model, forest))
+
+    ml_flag = scored["ml_pred"] >= ml_threshold
+    if model["target"] in scored.columns:
+        rule_flag = scored[model["target"]] >= rule_threshold
+    else:
+        rule_flag = pd.Series(False, index=scored.index)
+
+    return {
+        "rule": scored[rule_flag],
+        "ml": scored[ml_flag],
+        "both": scored[rule_flag & ml_flag],
+    }
+
+
+# -------- OUTPUT --------
+def _write(results, output_dir, first):
+    for name, frame in results.items():
+        frame.to_csv(
+            os.path.join(output_dir, OUTPUTS[name]),
+            mode="w" if first else "a",
+            header=first,
+            index_label="student_id",
+        )
+
+
+def score_file(
+    path,
+    output_dir,
+    rule_threshold=2,
+    ml_threshold=2,
+    chunksize=50_000,
+    workers=None,
+    dataset=STRESS_LEVEL_DATASET,
+):
+    # train (or fetch) the model once in the parent so workers only load it
+    load_alert_model(dataset)
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    counts = {name: 0 for name in OUTPUTS}
+
+    def collect(future, first):
+        results = future.result()
+        _write(results, output_dir, first)
+        for name, frame in results.items():
+            counts[name] += len(frame)
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(dataset,)) as pool:
+        # at most 2 chunks per worker in flight keeps memory bounded; results
+        # are written in input order
+        pending = deque()
+        written = 0
+        for chunk in iter_chunks(path, chunksize):
+            pending.append(pool.submit(score_chunk, chunk, rule_threshold, ml_threshold))
+            if len(pending) >= 2 * workers:
+                collect(pending.popleft(), written == 0)
+                written += 1
+        while pending:
+            collect(pending.popleft(), written == 0)
+            written += 1
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="CSV or Parquet file of students to score")
+    parser.add_argument("--output-dir", default="alerts", help="where the alert lists are written")
+    parser.add_argument("--rule-threshold", type=int, default=2, help="minimum recorded stress_level")
+    parser.add_argument("--ml-threshold", type=int, default=2, help="minimum predicted stress_level")
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to the CPU count")
+    parser.add_argument(
+        "--dataset",
+        default=STRESS_LEVEL_DATASET,
+        help="training data of the registered model",
+    )
+    args = parser.parse_args(argv)
+
+    counts = score_file(
+        args.input,
+        args.output_dir,
+        rule_threshold=args.rule_threshold,
+        ml_threshold=args.ml_threshold,
+        chunksize=args.chunksize,
+        workers=args.workers,
+        dataset=args.dataset,
+    )
+    for name, n in counts.items():
+        print(f"{OUTPUTS[name]}: {n} students")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
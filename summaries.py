@@ -0,0 +1,193 @@
+import json
+import os
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from data_store import CACHE_DIR, clean_stress_dataset, dataset_name, file_version, memoized
+from timings import span
+
+CHUNK_ROWS = 100_000
+COUNT_COLUMNS = ("stress_type", "stress_level")
+
+
+def _scalar(value):
+    # numpy scalars -> plain Python values, so summaries serialize to JSON
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class DatasetSummary:
+    """Shape, missing values, numeric bounds and label counts of a dataset.
+
+    Built chunk by chunk with update(); summaries of different chunks or
+    files with the same columns combine with merge().
+    """
+
+    def __init__(self, count_columns=COUNT_COLUMNS):
+        self.count_columns = tuple(count_columns)
+        self.columns = None
+        self.rows = 0
+        self.missing = {}
+        self.mins = {}
+        self.maxs = {}
+        self.counts = {}
+
+    @property
+    def shape(self):
+        return self.rows, len(self.columns or ())
+
+    @property
+    def total_missing(self):
+        return sum(self.missing.values())
+
+    def value_counts(self, col):
+        counts = pd.Series(self.counts.get(col, {}), name="count", dtype="int64")
+        counts.index.name = col
+        return counts.sort_values(ascending=False, kind="stable")
+
+    def _check_columns(self, columns):
+        if self.columns is None:
+            self.columns = list(columns)
+        elif list(columns) != self.columns:
+            raise ValueError("cannot combine summaries with different columns")
+
+    def _merge_bounds(self, mins, maxs):
+        for col, value in mins.items():
+            self.mins[col] = min(self.mins.get(col, value), value)
+        for col, value in maxs.items():
+            self.maxs[col] = max(self.maxs.get(col, value), value)
+
+    def update(self, chunk):
+        self._check_columns(chunk.columns)
+        self.rows += len(chunk)
+        for col, n in chunk.isna().sum().items():
+            self.missing[col] = self.missing.get(col, 0) + int(n)
+
+        numeric = chunk.select_dtypes(include=[np.number])
+        if len(numeric):
+            self._merge_bounds(
+                {c: _scalar(v) for c, v in numeric.min().dropna().items()},
+                {c: _scalar(v) for c, v in numeric.max().dropna().items()},
+            )
+
+        for col in self.count_columns:
+            if col in chunk.columns:
+                counts = chunk[col].value_counts()
+                self.counts.setdefault(col, Counter()).update(
+                    {_scalar(k): int(v) for k, v in counts.items()}
+                )
+        return self
+
+    def merge(self, other):
+        if other.columns is None:
+            return self
+        self._check_columns(other.columns)
+        self.rows += other.rows
+        for col, n in other.missing.items():
+            self.missing[col] = self.missing.get(col, 0) + n
+        self._merge_bounds(other.mins, other.maxs)
+        for col, counts in other.counts.items():
+            self.counts.setdefault(col, Counter()).update(counts)
+        return self
+
+    def to_dict(self):
+        return {
+            "count_columns": list(self.count_columns),
+            "columns": self.columns,
+            "rows": self.rows,
+            "missing": self.missing,
+            "mins": self.mins,
+            "maxs": self.maxs,
+            # JSON keys are strings: keep the counts as pairs to preserve int labels
+            "counts": {col: list(c.items()) for col, c in self.counts.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls(data["count_columns"])
+        summary.columns = data["columns"]
+        summary.rows = data["rows"]
+        summary.missing = data["missing"]
+        summary.mins = data["mins"]
+        summary.maxs = data["maxs"]
+        summary.counts = {col: Counter(dict(map(tuple, c))) for col, c in data["counts"].items()}
+        return summary
+
+
+# -------- STREAMING READERS --------
+def _read_chunks(path, chunksize):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        offset = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            chunk = batch.to_pandas()
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            yield chunk
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def iter_chunks(path, clean=False, chunksize=CHUNK_ROWS):
+    for chunk in _read_chunks(path, chunksize):
+        yield clean_stress_dataset(chunk) if clean else chunk
+
+
+def summarize_csv(path, clean=False, chunksize=CHUNK_ROWS, count_columns=COUNT_COLUMNS):
+    summary = DatasetSummary(count_columns)
+    for chunk in iter_chunks(path, clean=clean, chunksize=chunksize):
+        summary.update(chunk)
+    return summary
+
+
+def summarize_files(paths, clean=False, chunksize=CHUNK_ROWS):
+    summary = DatasetSummary()
+    for path in paths:
+        summary.merge(load_summary(path, clean=clean, chunksize=chunksize))
+    return summary
+
+
+def preview_rows(path, n=5, clean=False, chunksize=CHUNK_ROWS):
+    # stops reading as soon as n rows survive the cleaning step
+    parts, found = [], 0
+    with span("load"):
+        for chunk in iter_chunks(path, clean=clean, chunksize=chunksize):
+            parts.append(chunk.head(n - found))
+            found += len(parts[-1])
+            if found >= n:
+                break
+    return pd.concat(parts) if parts else pd.DataFrame()
+
+
+# -------- CACHE --------
+def _summary_path(path, clean):
+    suffix = ".clean" if clean else ""
+    return os.path.join(CACHE_DIR, f"{dataset_name(path)}{suffix}.summary.json")
+
+
+def load_summary(path, clean=False, chunksize=CHUNK_ROWS):
+    version = file_version(path)
+    summary_path = _summary_path(path, clean)
+
+    def build():
+        try:
+            with open(summary_path) as f:
+                stored = json.load(f)
+            if stored["version"] == version:
+                return DatasetSummary.from_dict(stored["summary"])
+        except (OSError, ValueError, KeyError):
+            pass
+        # one streamed pass over the file: reading and summarizing interleave
+        with span("load"):
+            summary = summarize_csv(path, clean=clean, chunksize=chunksize)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{summary_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": version, "summary": summary.to_dict()}, f)
+        os.replace(tmp, summary_path)
+        return summary
+
+    return memoized(("summary", path, clean), version, build)
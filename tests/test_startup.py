@@ -0,0 +1,19 @@
+"""Page import budgets from benchmarks/bench_startup.py, run under pytest."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import bench_startup  # noqa: E402
+
+
+@pytest.mark.parametrize("page", list(bench_startup.BUDGETS))
+def test_page_defers_heavy_imports(page):
+    _, _, _, modules = bench_startup.measure(page)
+    assert bench_startup.eager_modules(modules) == []
+
+
+def test_pages_within_import_budget():
+    assert bench_startup.main(["--repeat", "3"]) == 0
@@ -0,0 +1,203 @@
+"""Where a rerun spends its time: per-stage spans, histograms and a Prometheus export.
+
+Pages and loaders wrap their stages in span("load"), span("fit"), ...;
+every span is recorded under the page whose rerun it ran in (or
+"background" for refresh threads and scripts). Spans nest, and a
+span's time includes the spans inside it.
+
+The histograms are exported in the Prometheus text format to
+METRICS_PATH (for node_exporter's textfile collector) at most every
+EXPORT_INTERVAL seconds, and served at /metrics when
+STRESS_MONITOR_METRICS_PORT is set. The Performance view
+(visualization.py?performance) shows percentiles of recent spans.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+STAGES = ("load", "preprocess", "scale", "fit", "predict", "plot", "dataframe", "rerun")
+# Prometheus' default buckets, extended for model fits and cold reruns (seconds)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# spans kept per (page, stage) for the percentiles on the Performance view
+RECENT_SPANS = 1000
+METRICS_PATH = os.environ.get(
+    "STRESS_MONITOR_METRICS", os.path.join(os.environ.get("STRESS_MONITOR_CACHE", ".cache"), "metrics.prom")
+)
+METRICS_PORT = os.environ.get("STRESS_MONITOR_METRICS_PORT")
+EXPORT_INTERVAL = 10.0
+
+_local = threading.local()
+_lock = threading.Lock()
+_series = {}
+_exported = 0.0
+_server = None
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of one (page, stage), plus its recent spans."""
+
+    def __init__(self, buckets=BUCKETS, recent=RECENT_SPANS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=recent)
+
+    def observe(self, seconds):
+        # buckets are few: a linear scan beats bisect's call overhead
+        i = 0
+        while i < len(self.buckets) and seconds > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += seconds
+        self.count += 1
+        self.recent.append(seconds)
+
+    def cumulative(self):
+        total, out = 0, []
+        for n in self.counts:
+            total += n
+            out.append(total)
+        return out
+
+
+def quantiles(values, qs=(0.5, 0.95, 0.99)):
+    import numpy as np
+
+    if not values:
+        return [None] * len(qs)
+    return [float(q) for q in np.quantile(np.asarray(values, dtype=np.float64), qs)]
+
+
+# -------- RECORDING --------
+def current_page():
+    return getattr(_local, "page", "background")
+
+
+def observe(stage, seconds, page=None):
+    key = (page or current_page(), stage)
+    with _lock:
+        histogram = _series.get(key)
+        if histogram is None:
+            histogram = _series[key] = Histogram()
+        histogram.observe(seconds)
+
+
+class span:
+    """Time the block as stage of the current page's rerun."""
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.stage, time.perf_counter() - self.started)
+
+
+def start_page(page):
+    # called first thing in a script: later spans in this thread belong to its rerun
+    _local.page = page
+    _local.started = time.perf_counter()
+    if METRICS_PORT and _server is None:
+        serve_metrics(int(METRICS_PORT))
+
+
+def end_page():
+    # called last in a script; a rerun cut short (st.stop, an error) is not recorded
+    started = getattr(_local, "started", None)
+    if started is not None:
+        observe("rerun", time.perf_counter() - started)
+        _local.started = None
+    maybe_export()
+
+
+def snapshot():
+    """(page, stage) -> (count, sum, p50, p95, p99) of everything recorded so far."""
+    with _lock:
+        series = {key: (h.count, h.sum, list(h.recent)) for key, h in _series.items()}
+    return {key: (count, total, *quantiles(recent)) for key, (count, total, recent) in series.items()}
+
+
+def reset():
+    with _lock:
+        _series.clear()
+
+
+# -------- EXPORT --------
+def prometheus_text():
+    """All histograms in the Prometheus text exposition format."""
+    lines = [
+        "# HELP stress_monitor_stage_seconds Time spent in each stage of a page rerun.",
+        "# TYPE stress_monitor_stage_seconds histogram",
+    ]
+    with _lock:
+        series = sorted(_series.items())
+        for (page, stage), h in series:
+            labels = f'page="{page}",stage="{stage}"'
+            for bound, n in zip((*h.buckets, "+Inf"), h.cumulative()):
+                le = bound if bound == "+Inf" else f"{bound:g}"
+                lines.append(f'stress_monitor_stage_seconds_bucket{{{labels},le="{le}"}} {n}')
+            lines.append(f"stress_monitor_stage_seconds_sum{{{labels}}} {h.sum:.6f}")
+            lines.append(f"stress_monitor_stage_seconds_count{{{labels}}} {h.count}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path=METRICS_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(prometheus_text())
+    # the collector must never read a half-written file
+    os.replace(tmp, path)
+    return path
+
+
+def maybe_export(path=METRICS_PATH, interval=EXPORT_INTERVAL):
+    global _exported
+    now = time.monotonic()
+    with _lock:
+        if now - _exported < interval:
+            return False
+        _exported = now
+    try:
+        write_metrics(path)
+    except OSError:
+        return False
+    return True
+
+
+def serve_metrics(port, host="127.0.0.1"):
+    """Serve prometheus_text() at http://host:port/metrics from a daemon thread."""
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    with _lock:
+        if _server is not None:
+            return _server or None
+        try:
+            _server = ThreadingHTTPServer((host, port), Handler)
+        except OSError:
+            # another process (a second app instance) already serves this port
+            _server = False
+            return None
+    threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    return _server
@@ -1,8 +1,11 @@
 import streamlit as st
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
-import seaborn as sns
+
+from artifacts import enable_background_refresh
+from data_store import STRESS_DATASET, STRESS_LEVEL_DATASET, pin_versions
+from partitions import select_partition
+from performance import show_performance
+from summaries import load_summary, preview_rows
+from timings import end_page, span, start_page
 
 st.set_page_config(
     page_title="Stress Monitor - Educational Institutions",
@@ -10,6 +13,21 @@ st.set_page_config(
     layout="wide",
 )
 
+# hidden Performance view (?performance in the URL): not listed in the sidebar
+if "performance" in st.query_params:
+    show_performance()
+    st.stop()
+
+# every stage below is timed under this page (see timings.py)
+start_page("home")
+
+# a changed data file is reprocessed in the background while the last version keeps serving
+enable_background_refresh()
+# institution and survey wave to show; the flat CSVs when there is no partitioned data
+stress_path, stress_level_path = select_partition(STRESS_DATASET, STRESS_LEVEL_DATASET)
+# one version of each file for this whole run, even if a refresh publishes meanwhile
+pin_versions(stress_path, stress_level_path, frames=False)
+
 # -------- SIDEBAR --------
 with st.sidebar:
     st.markdown("### 🧠 Stress Monitor")
@@ -21,7 +39,8 @@ with st.sidebar:
             - Open **Alerts** to view automatically detected risk cases.  
             - Check **Distribution** for breakdowns by age, gender, and category.  
             - Use **Recommendations** to explore suggested interventions.  
-            - Visit **Risk groups** to inspect clusters of students needing attention.
+            - Visit **Risk groups** to inspect clusters of students needing attention.  
+            - See **Feature screening** for the questions most tied to each stress type.
             """
         )
 
@@ -144,8 +163,10 @@ st.markdown("""
 
 # Dataset cards row
 try:
-    df1 = pd.read_csv("Stress_Dataset.csv")
-    df2 = pd.read_csv("StressLevelDataset.csv")
+    # overview cards come from the cached one-pass summaries, not full frames
+    summary1 = load_summary(stress_path)
+    summary1_clean = load_summary(stress_path, clean=True)
+    summary2 = load_summary(stress_level_path)
 
     c1, c2 = st.columns(2)
 
@@ -162,8 +183,8 @@ try:
             ">
                 <h3 style="margin:0; font-size:1.2rem; color:#1e3a8a;">📄 Dataset 1: <i>Stress_Dataset.csv</i></h3>
                 <p style="margin:0.5rem 0 0; font-size:0.98rem; color:#1f2937;">
-                    <b>Records:</b> {df1.shape[0]}<br>
-                    <b>Features:</b> {df1.shape[1]}
+                    <b>Records:</b> {summary1.shape[0]}<br>
+                    <b>Features:</b> {summary1.shape[1]}
                 </p>
             </div>
             """,
@@ -183,8 +204,8 @@ try:
             ">
                 <h3 style="margin:0; font-size:1.2rem; color:#166534;">📄 Dataset 2: <i>StressLevelDataset.csv</i></h3>
                 <p style="margin:0.5rem 0 0; font-size:0.98rem; color:#1f2937;">
-                    <b>Records:</b> {df2.shape[0]}<br>
-                    <b>Features:</b> {df2.shape[1]}
+                    <b>Records:</b> {summary2.shape[0]}<br>
+                    <b>Features:</b> {summary2.shape[1]}
                 </p>
             </div>
             """,
@@ -225,20 +246,17 @@ try:
                 """
             )
 
-        df1_clean = df1[(df1["Age"] >= 18) & (df1["Age"] <= 21)].copy()
-        df1_clean.rename(
-            columns={"Which type of stress do you primarily experience?": "stress_type"},
-            inplace=True,
-        )
-
         st.markdown("### Preview of the first few rows")
-        st.dataframe(df1_clean.head(), use_container_width=True)
+        preview1 = preview_rows(stress_path, clean=True)
+        with span("dataframe"):
+            st.dataframe(preview1, use_container_width=True)
 
+        # counts come from value_counts, so the most frequent stress type is listed first
+        stress_types = list(summary1_clean.counts["stress_type"])
         st.markdown(
             f"**Target variable:** `stress_type` "
-            f"({df1_clean['stress_type'].nunique()} categories)"
+            f"({len(stress_types)} categories)"
         )
-        stress_types = df1_clean["stress_type"].unique()
         st.markdown("\n".join([f"- 🔸 **{s}**" for s in stress_types]))
 
     with tab2:
@@ -261,11 +279,15 @@ try:
             )
 
         st.markdown("### Preview of the first few rows")
-        st.dataframe(df2.head(), use_container_width=True)
+        preview2 = preview_rows(stress_level_path)
+        with span("dataframe"):
+            st.dataframe(preview2, use_container_width=True)
 
         st.markdown(
-            f"**Target variable:** `stress_level` (0–{df2['stress_level'].nunique() - 1})"
+            f"**Target variable:** `stress_level` (0–{len(summary2.counts['stress_level']) - 1})"
         )
 
 except Exception as e:
     st.error(f"Error loading datasets: {e}")
+
+end_page()